@@ -0,0 +1,377 @@
+"""
+Benchmarks for django-browser-reload.
+
+Run from the repository root with:
+
+    python benchmarks/run.py
+
+Covers:
+
+* Script injection by the middleware, for HTML bodies from 10 KB to 20 MB,
+  plain, appended, streaming, and gzip-compressed.
+* Classifying changed files against projects with 1 to 500 watched roots,
+  and building the watched root index.
+* Latency from a file change to the reload message arriving on the events
+  stream, for the WSGI and ASGI branches, with several concurrent
+  subscribers.
+
+Inputs are generated deterministically, so runs on the same machine are
+comparable. Pass --json to write the results to a file, for comparing
+between commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import AsyncGenerator, Callable, Iterator
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import HttpResponse, StreamingHttpResponse  # noqa: E402
+from django.http.response import HttpResponseBase  # noqa: E402
+from django.test import (  # noqa: E402
+    AsyncRequestFactory,
+    RequestFactory,
+    override_settings,
+)
+
+from django_browser_reload import views  # noqa: E402
+from django_browser_reload.middleware import BrowserReloadMiddleware  # noqa: E402
+
+KB = 1024
+MB = 1024 * KB
+
+INJECTION_SIZES = [10 * KB, 100 * KB, 1 * MB, 5 * MB, 20 * MB]
+ROOT_COUNTS = [1, 10, 100, 500]
+SUBSCRIBER_COUNTS = [1, 10, 50]
+LATENCY_ROUNDS = 10
+
+
+def summarize(timings: list[float]) -> dict[str, float]:
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+    }
+
+
+def measure(
+    func: Callable[[Any], object],
+    setup: Callable[[], Any],
+    repeat: int,
+) -> dict[str, float]:
+    """
+    Time func on a fresh value from setup, repeat times.
+    """
+    timings = []
+    for _ in range(repeat):
+        value = setup()
+        start = time.perf_counter()
+        func(value)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def html_body(size: int) -> bytes:
+    tail = b"</body></html>"
+    line = b"<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>\n"
+    head = b"<!doctype html><html><head><title>Bench</title></head><body>\n"
+    count = max(0, (size - len(head) - len(tail)) // len(line))
+    return head + line * count + tail
+
+
+def chunked(content: bytes, size: int) -> Iterator[bytes]:
+    for start in range(0, len(content), size):
+        yield content[start : start + size]
+
+
+def streaming_response(content: bytes) -> StreamingHttpResponse:
+    return StreamingHttpResponse(chunked(content, 8 * KB), content_type="text/html")
+
+
+def bench_injection() -> list[dict[str, Any]]:
+    request = RequestFactory().get("/")
+    middleware = BrowserReloadMiddleware(lambda request: HttpResponse())
+    results = []
+    for size in INJECTION_SIZES:
+        content = html_body(size)
+        repeat = 50 if size <= MB else 10
+
+        results.append(
+            {
+                "name": "inject",
+                "size": size,
+                **measure(
+                    lambda response: middleware.maybe_inject(request, response),
+                    partial(HttpResponse, content),
+                    repeat,
+                ),
+            }
+        )
+
+        def consume(response: StreamingHttpResponse) -> None:
+            middleware.maybe_inject(request, response)
+            for _ in response:
+                pass
+
+        results.append(
+            {
+                "name": "inject_streaming",
+                "size": size,
+                **measure(
+                    consume,
+                    partial(streaming_response, content),
+                    repeat,
+                ),
+            }
+        )
+
+        with override_settings(BROWSER_RELOAD_INJECTION_MODE="append"):
+            results.append(
+                {
+                    "name": "inject_append",
+                    "size": size,
+                    **measure(
+                        lambda response: middleware.maybe_inject(request, response),
+                        partial(HttpResponse, content),
+                        repeat,
+                    ),
+                }
+            )
+
+        compressed = gzip.compress(content, compresslevel=6)
+        with override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True):
+            results.append(
+                {
+                    "name": "inject_gzip",
+                    "size": size,
+                    **measure(
+                        lambda response: middleware.maybe_inject(request, response),
+                        partial(gzip_response, compressed),
+                        repeat,
+                    ),
+                }
+            )
+    return results
+
+
+def gzip_response(content: bytes) -> HttpResponse:
+    response = HttpResponse(content)
+    response["content-encoding"] = "gzip"
+    return response
+
+
+def bench_classification() -> list[dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base = Path(temp_dir)
+        for count in ROOT_COUNTS:
+            directories = [base / f"static{i}" for i in range(count)]
+            for directory in directories:
+                directory.mkdir(exist_ok=True)
+
+            with override_settings(STATICFILES_DIRS=directories):
+                results.append(
+                    {
+                        "name": "watched_roots",
+                        "roots": count,
+                        **measure(
+                            lambda _: views.watched_roots(),
+                            views.clear_watched_roots,
+                            20,
+                        ),
+                    }
+                )
+
+                views.watched_roots()
+                hit = directories[-1] / "css" / "components" / "deep" / "a.css"
+                miss = base.parent / "elsewhere" / "module.py"
+                for name, path in [("classify_hit", hit), ("classify_miss", miss)]:
+                    results.append(
+                        {
+                            "name": name,
+                            "roots": count,
+                            **measure(
+                                views.classify_path,
+                                partial(Path, path),
+                                1000,
+                            ),
+                        }
+                    )
+                views.clear_watched_roots()
+    return results
+
+
+def is_ping(chunk: bytes) -> bool:
+    return chunk.startswith(b'data: {"type": "ping"')
+
+
+def change() -> views.Change:
+    root = views.WatchedRoot(ROOT / "tests" / "static", "static")
+    return views.Change(root.path / "example.js", root)
+
+
+def _latency_wsgi_round(subscribers: int) -> list[float]:
+    factory = RequestFactory(headers={"accept": "text/event-stream"})
+    responses = [views.events(factory.get("/")) for _ in range(subscribers)]
+    ready = threading.Barrier(subscribers + 1)
+    received: list[float] = []
+    lock = threading.Lock()
+
+    def consume(response: HttpResponseBase) -> None:
+        iterator = iter(response)
+        next(iterator)
+        ready.wait()
+        for chunk in iterator:
+            if not is_ping(chunk):
+                with lock:
+                    received.append(time.perf_counter())
+                return
+
+    threads = [
+        threading.Thread(target=consume, args=(response,)) for response in responses
+    ]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    views.trigger_reload_soon(change())
+    for thread in threads:
+        thread.join()
+    for response in responses:
+        response.close()
+    return [t - start for t in received]
+
+
+def bench_latency_wsgi(subscribers: int) -> dict[str, Any]:
+    latencies = []
+    for _ in range(LATENCY_ROUNDS):
+        latencies.extend(_latency_wsgi_round(subscribers))
+    return {"name": "latency_wsgi", "subscribers": subscribers, **summarize(latencies)}
+
+
+async def _latency_asgi_round(subscribers: int) -> list[float]:
+    factory = AsyncRequestFactory(headers={"accept": "text/event-stream"})
+    responses = [views.events(factory.get("/")) for _ in range(subscribers)]
+    ready = asyncio.Event()
+    started = 0
+
+    async def consume(response: HttpResponseBase) -> float:
+        nonlocal started
+        iterator: AsyncGenerator[bytes] = aiter(response)  # type: ignore [arg-type]
+        await anext(iterator)
+        started += 1
+        if started == subscribers:
+            ready.set()
+        async for chunk in iterator:
+            if not is_ping(chunk):
+                break
+        received = time.perf_counter()
+        await iterator.aclose()
+        return received
+
+    tasks = [asyncio.create_task(consume(response)) for response in responses]
+    await ready.wait()
+    start = time.perf_counter()
+    # The debouncer thread delivers the message, as for real file changes.
+    views.trigger_reload_soon(change())
+    received = await asyncio.gather(*tasks)
+    return [t - start for t in received]
+
+
+def bench_latency_asgi(subscribers: int) -> dict[str, Any]:
+    latencies = []
+    for _ in range(LATENCY_ROUNDS):
+        latencies.extend(asyncio.run(_latency_asgi_round(subscribers)))
+    return {"name": "latency_asgi", "subscribers": subscribers, **summarize(latencies)}
+
+
+def bench_latency() -> list[dict[str, Any]]:
+    results = []
+    # Measure the overhead of the debouncer, rather than its delay.
+    with override_settings(BROWSER_RELOAD_DEBOUNCE_TIME=0.0):
+        for subscribers in SUBSCRIBER_COUNTS:
+            results.append(bench_latency_wsgi(subscribers))
+            results.append(bench_latency_asgi(subscribers))
+    return results
+
+
+BENCHMARKS = {
+    "injection": bench_injection,
+    "classification": bench_classification,
+    "latency": bench_latency,
+}
+
+
+def format_result(result: dict[str, Any]) -> str:
+    params = ", ".join(
+        f"{key}={value}"
+        for key, value in result.items()
+        if key not in ("name", "min", "median", "max")
+    )
+    return (
+        f"{result['name']:<18} {params:<18}"
+        f" min {result['min'] * 1e6:>12.1f}µs"
+        f" median {result['median'] * 1e6:>12.1f}µs"
+        f" max {result['max'] * 1e6:>12.1f}µs"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="benchmark",
+        help=f"Benchmarks to run, from: {', '.join(BENCHMARKS)}. Default all.",
+    )
+    parser.add_argument("--json", type=Path, help="Write results to this file.")
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    results = []
+    with override_settings(DEBUG=True):
+        for name in args.benchmarks or BENCHMARKS:
+            print(f"# {name}")
+            for result in BENCHMARKS[name]():
+                print(format_result(result))
+                results.append(result)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from collections.abc import Callable
+from functools import cache
+from pathlib import Path
+from typing import NoReturn
+
+logger = logging.getLogger("django_browser_reload")
+
+# Flags from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+# Files are reported once written and closed, or moved in, such as by editors
+# that save to a temporary file and rename it. Created directories are
+# watched in turn.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+# struct inotify_event, followed by a null-padded name of length len.
+EVENT = struct.Struct("iIII")
+
+BUFFER_SIZE = 64 * 1024
+
+
+@cache
+def libc() -> ctypes.CDLL:
+    """
+    Load the C library's inotify functions, raising OSError if unavailable.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+    lib = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    try:
+        lib.inotify_init1.argtypes = [ctypes.c_int]
+        lib.inotify_init1.restype = ctypes.c_int
+        lib.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        lib.inotify_add_watch.restype = ctypes.c_int
+    except AttributeError as exc:
+        raise OSError(errno.ENOSYS, "inotify is not available") from exc
+    return lib
+
+
+def raise_errno(filename: Path | None = None) -> NoReturn:
+    code = ctypes.get_errno()
+    raise OSError(code, os.strerror(code), None if filename is None else str(filename))
+
+
+class InotifyWatcher:
+    """
+    Watch directory trees with Linux's inotify, on a background thread,
+    calling callback with the path of each file written or moved in.
+
+    Unlike polling, this costs nothing while files are unchanged, however
+    many files there are. Each watched directory uses one of the user's
+    inotify watches, limited by the fs.inotify.max_user_watches sysctl.
+    """
+
+    def __init__(self, callback: Callable[[Path], object]) -> None:
+        self.callback = callback
+        self.fd = libc().inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise_errno()
+        # Watch descriptors to their directory, and the function to exclude
+        # its subdirectories by name with.
+        self.watches: dict[int, tuple[Path, Callable[[str], bool] | None]] = {}
+        self.stop_read, self.stop_write = os.pipe()
+        self.thread = threading.Thread(
+            target=self.run, name="django-browser-reload-inotify", daemon=True
+        )
+
+    def watch(
+        self,
+        directory: Path,
+        exclude: Callable[[str], bool] | None = None,
+    ) -> None:
+        """
+        Watch directory and its subdirectories, besides those with names
+        matching exclude. Raises OSError if the watch limit is reached.
+        """
+        self.add_tree(directory, exclude, None)
+
+    def add_tree(
+        self,
+        directory: Path,
+        exclude: Callable[[str], bool] | None,
+        files: list[Path] | None,
+    ) -> None:
+        wd = libc().inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR):
+                # Removed since it was listed.
+                return
+            raise_errno(directory)
+        if wd in self.watches:
+            # Already watched, through a symlink.
+            return
+        self.watches[wd] = (directory, exclude)
+
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.is_dir():
+                if files is not None:
+                    files.append(Path(entry.path))
+            elif exclude is None or not exclude(entry.name):
+                self.add_tree(Path(entry.path), exclude, files)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread.is_alive():
+            os.write(self.stop_write, b"\0")
+            self.thread.join()
+        self.close()
+
+    def close(self) -> None:
+        for fd in (self.fd, self.stop_read, self.stop_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def run(self) -> None:
+        while True:
+            readable, _, _ = select.select([self.fd, self.stop_read], [], [])
+            if self.stop_read in readable:
+                return
+            for path in self.read_events():
+                try:
+                    self.callback(path)
+                except Exception:
+                    # Keep watching, as the directories aren't watched
+                    # otherwise.
+                    logger.exception("Error handling change to %s", path)
+
+    def read_events(self) -> list[Path]:
+        """
+        Read pending events, returning the paths of changed files.
+        """
+        data = os.read(self.fd, BUFFER_SIZE)
+        changed: list[Path] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_IGNORED:
+                # The directory was removed.
+                self.watches.pop(wd, None)
+                continue
+            # Events for unknown descriptors include queue overflows, which
+            # lose events that can't be recovered.
+            if wd not in self.watches:
+                continue
+
+            directory, exclude = self.watches[wd]
+            path = directory / name
+            if mask & IN_ISDIR:
+                if exclude is None or not exclude(name):
+                    # Report files created before the directory was watched.
+                    try:
+                        self.add_tree(path, exclude, changed)
+                    except OSError:
+                        pass
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                changed.append(path)
+        return changed
@@ -1,36 +1,70 @@
 from __future__ import annotations
 
+import json
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.templatetags.static import static
-from django.urls import reverse
-from django.utils.html import format_html
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
 
 
-def django_browser_reload_script(nonce: str | None = None) -> str:
+def django_browser_reload_script(
+    nonce: str | None = None, *, templates: Iterable[str] | None = None
+) -> str:
     if not settings.DEBUG:
         return ""
+    opening = script_opening(get_script_prefix(), get_urlconf())
+    if templates is not None:
+        # For scoped reloads, the template files the page was rendered with
+        opening += format_html(' data-templates="{}"', json.dumps(sorted(templates)))
     if nonce:
-        return format_html(
-            (
-                '<script src="{}"'
-                + ' data-worker-script-path="{}"'
-                + ' data-events-path="{}"'
-                + ' defer nonce="{}"></script>'
-            ),
-            static("django-browser-reload/reload-listener.js"),
-            static("django-browser-reload/reload-worker.js"),
-            reverse("django_browser_reload:events"),
-            nonce,
-        )
+        return mark_safe(f'{opening} nonce="{escape(nonce)}"></script>')
     else:
-        return format_html(
-            (
-                '<script src="{}"'
-                + ' data-worker-script-path="{}"'
-                + ' data-events-path="{}"'
-                + " defer></script>"
-            ),
-            static("django-browser-reload/reload-listener.js"),
-            static("django-browser-reload/reload-worker.js"),
-            reverse("django_browser_reload:events"),
-        )
+        return mark_safe(f"{opening}></script>")
+
+
+@lru_cache
+def script_opening(script_prefix: str, urlconf: object) -> str:
+    """
+    Render the script tag up to its closing '>', for the given script prefix
+    and URLconf, which static() and reverse() depend on. Cached as resolving
+    static URLs can be slow with some storage backends, and cleared when
+    settings change.
+    """
+    opening = format_html(
+        (
+            '<script src="{}"'
+            + ' data-worker-script-path="{}"'
+            + ' data-events-path="{}"'
+            + " defer"
+        ),
+        static("django-browser-reload/reload-listener.js"),
+        static("django-browser-reload/reload-worker.js"),
+        reverse("django_browser_reload:events"),
+    )
+    if getattr(settings, "BROWSER_RELOAD_SOFT_RELOADS", False):
+        opening += mark_safe(" data-soft-reload")
+    return opening
+
+
+@lru_cache
+def preload_link(script_prefix: str, urlconf: object) -> str:
+    """
+    Return a Link header value to preload the listener script, cached like
+    script_opening().
+    """
+    url = static("django-browser-reload/reload-listener.js")
+    return f"<{url}>; rel=preload; as=script"
+
+
+@receiver(setting_changed, dispatch_uid="browser_reload_script")
+def clear_script_opening(**kwargs: Any) -> None:
+    # Settings such as STATIC_URL, STORAGES, or ROOT_URLCONF can affect URLs.
+    script_opening.cache_clear()
+    preload_link.cache_clear()
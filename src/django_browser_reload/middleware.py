@@ -1,17 +1,41 @@
 from __future__ import annotations
 
+import gzip
+import importlib
 import re
-from collections.abc import Awaitable, Callable
+import zlib
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache
+from typing import NamedTuple
 
 from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.core.exceptions import MiddlewareNotUsed
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from django.http.response import HttpResponseBase
+from django.template.base import Template
+from django.template.context import Context
+from django.urls import get_script_prefix, get_urlconf
+from django.utils.safestring import SafeString
 
-from django_browser_reload.jinja import django_browser_reload_script
+from django_browser_reload import stats
+from django_browser_reload.jinja import django_browser_reload_script, preload_link
 
-insert_before_re = re.compile(r"</body>", flags=re.IGNORECASE)
+# Responses larger than this, in bytes, only have their final search window
+# searched for </body>.
+TAIL_SEARCH_THRESHOLD = 1024 * 1024
+
+SEARCH_WINDOW = 64 * 1024
 
 
 class BrowserReloadMiddleware:
@@ -42,48 +66,370 @@ class BrowserReloadMiddleware:
         if self.async_mode:
             return self.__acall__(request)
 
-        response = self.get_response(request)
+        with record_templates() as templates:
+            response = self.get_response(request)
         assert isinstance(response, HttpResponseBase)
-        self.maybe_inject(request, response)
+        self.maybe_inject(request, response, templates)
         return response
 
     async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
-        result = self.get_response(request)
-        assert not isinstance(result, HttpResponseBase)  # type narrow
-        response = await result
-        self.maybe_inject(request, response)
+        with record_templates() as templates:
+            result = self.get_response(request)
+            assert not isinstance(result, HttpResponseBase)  # type narrow
+            response = await result
+        self.maybe_inject(request, response, templates)
         return response
 
-    def maybe_inject(self, request: HttpRequest, response: HttpResponseBase) -> None:
+    def maybe_inject(
+        self,
+        request: HttpRequest,
+        response: HttpResponseBase,
+        templates: set[str] | None = None,
+    ) -> None:
         if (
             not settings.DEBUG
-            or getattr(response, "streaming", False)
-            or response.headers.get("content-encoding", "")
             or response.headers.get("content-type", "").split(";", 1)[0] != "text/html"
         ):
             return
 
-        assert isinstance(response, HttpResponse)
-        content = response.content.decode(response.charset)
-        # Find last match
-        found = False
-        for match in insert_before_re.finditer(content):  # noqa: B007
-            found = True
-        if not found:
+        encoding = response.headers.get("content-encoding", "")
+        codec = None
+        if encoding:
+            if getattr(settings, "BROWSER_RELOAD_INJECT_COMPRESSED", False):
+                codec = content_codecs().get(encoding.strip().lower())
+            if codec is None or getattr(response, "streaming", False):
+                stats.record("response_skipped", reason="encoded")
+                return
+
+        if getattr(response, "streaming", False):
+            self.maybe_inject_streaming(request, response)
             return
 
-        head = content[: match.start()]
-        tag = match[0]
-        tail = content[match.end() :]
+        assert isinstance(response, HttpResponse)
+        content = response.content
+        if codec is not None:
+            try:
+                content = codec.decompress(content)
+            except codec.errors:
+                stats.record("response_skipped", reason="encoded")
+                return
+        append = (
+            codec is None
+            and getattr(settings, "BROWSER_RELOAD_INJECTION_MODE", "insert") == "append"
+        )
+        tail_only = append or len(content) > getattr(
+            settings, "BROWSER_RELOAD_TAIL_SEARCH_THRESHOLD", TAIL_SEARCH_THRESHOLD
+        )
+        index = find_last(
+            content, insert_before_pattern(response.charset), tail_only=tail_only
+        )
+        if index is None:
+            stats.record("response_skipped", reason="no_body")
+            return
 
-        response.content = (
-            head
-            + django_browser_reload_script(
+        script = encode_fragment(
+            django_browser_reload_script(
                 # As set by Django's ContentSecurityPolicyMiddleware
                 getattr(request, "_csp_nonce", None),
-            )
-            + tag
-            + tail
+                templates=templates,
+            ),
+            response.charset,
         )
+        if append:
+            # Browsers run scripts after </body> as if they were inside it, so
+            # append the script, leaving the content as it is.
+            response.write(script)
+            length = len(content) + len(script)
+            add_preload_link(response)
+        else:
+            view = memoryview(content)
+            new_content = b"".join((view[:index], script, view[index:]))
+            if codec is not None:
+                new_content = codec.compress(
+                    new_content,
+                    getattr(
+                        settings, "BROWSER_RELOAD_COMPRESSION_LEVEL", COMPRESSION_LEVEL
+                    ),
+                )
+            response.content = new_content
+            length = len(new_content)
+        if "content-length" in response.headers:
+            response["content-length"] = length
+        stats.record("response_injected", size=len(script))
+        stats.increment("injected_bytes", len(script))
+
+    def maybe_inject_streaming(
+        self, request: HttpRequest, response: HttpResponseBase
+    ) -> None:
+        # A set content-length means the body is fixed, as for FileResponse.
         if "content-length" in response.headers:
-            response["content-length"] = len(response.content)
+            stats.record("response_skipped", reason="sized_stream")
+            return
+
+        assert isinstance(response, StreamingHttpResponse)
+        injector = StreamInjector(
+            script=encode_fragment(
+                django_browser_reload_script(
+                    getattr(request, "_csp_nonce", None),
+                ),
+                response.charset,
+            ),
+            pattern=insert_before_pattern(response.charset),
+        )
+        if response.is_async:
+            response.streaming_content = injector.wrap_async(
+                response.streaming_content  # type: ignore [arg-type]
+            )
+        else:
+            response.streaming_content = injector.wrap(
+                response.streaming_content  # type: ignore [arg-type]
+            )
+        stats.record("response_stream_wrapped")
+
+
+# Fast, as compressed responses are recompressed on every request.
+COMPRESSION_LEVEL = 1
+
+
+class Codec(NamedTuple):
+    decompress: Callable[[bytes], bytes]
+    compress: Callable[[bytes, int], bytes]
+    # Exceptions raised by decompress() for invalid data
+    errors: tuple[type[Exception], ...]
+
+
+def _decompress_deflate(data: bytes) -> bytes:
+    # HTTP's deflate is zlib-wrapped, but some servers send raw deflate.
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        return zlib.decompress(data, wbits=-zlib.MAX_WBITS)
+
+
+@cache
+def content_codecs() -> dict[str, Codec]:
+    """
+    Return codecs for the content encodings that can be decompressed, keyed
+    by encoding name. Brotli and Zstandard need optional packages.
+    """
+    codecs = {
+        "gzip": Codec(
+            gzip.decompress,
+            lambda data, level: gzip.compress(data, level, mtime=0),
+            (OSError, EOFError, zlib.error),
+        ),
+        "deflate": Codec(
+            _decompress_deflate,
+            lambda data, level: zlib.compress(data, level),
+            (zlib.error,),
+        ),
+    }
+
+    try:
+        brotli = importlib.import_module("brotli")
+    except ImportError:
+        pass
+    else:
+        codecs["br"] = Codec(
+            brotli.decompress,
+            lambda data, level: brotli.compress(data, quality=level),
+            (brotli.error,),
+        )
+
+    try:
+        # Python 3.14+
+        zstd = importlib.import_module("compression.zstd")
+    except ImportError:
+        try:
+            zstandard = importlib.import_module("zstandard")
+        except ImportError:
+            pass
+        else:
+            codecs["zstd"] = Codec(
+                lambda data: (
+                    zstandard.ZstdDecompressor().decompressobj().decompress(data)
+                ),
+                lambda data, level: zstandard.compress(data, level),
+                (zstandard.ZstdError,),
+            )
+    else:
+        codecs["zstd"] = Codec(
+            zstd.decompress,
+            lambda data, level: zstd.compress(data, level),
+            (zstd.ZstdError,),
+        )
+
+    return codecs
+
+
+def add_preload_link(response: HttpResponseBase) -> None:
+    """
+    Add a Link header to preload the listener script, so the browser can
+    fetch it while receiving the rest of the response.
+    """
+    link = preload_link(get_script_prefix(), get_urlconf())
+    existing = response.headers.get("link")
+    response.headers["link"] = f"{existing}, {link}" if existing else link
+
+
+def encode_fragment(text: str, charset: str) -> bytes:
+    """
+    Encode text for insertion within a document. Encodes after a prefix, then
+    removes the prefix, to drop any byte order mark from encodings like UTF-16.
+    """
+    prefix = "x".encode(charset)
+    return ("x" + text).encode(charset)[len(prefix) :]
+
+
+# Template files rendered in the current request, when recording them for
+# scoped reloads.
+rendered_templates: ContextVar[set[str] | None] = ContextVar(
+    "rendered_templates", default=None
+)
+
+
+@contextmanager
+def record_templates() -> Generator[set[str] | None]:
+    """
+    Record the template files rendered within the block, if scoped reloads are
+    enabled. Templates rendered while a streaming response is consumed, after
+    the block, are not recorded.
+    """
+    if not getattr(settings, "BROWSER_RELOAD_SCOPED_RELOADS", False):
+        yield None
+        return
+
+    install_template_recorder()
+    templates: set[str] = set()
+    token = rendered_templates.set(templates)
+    try:
+        yield templates
+    finally:
+        rendered_templates.reset(token)
+
+
+def install_template_recorder() -> None:
+    """
+    Wrap Django's Template._render to record the files of rendered templates,
+    including those extended or included, like Django's test runner does.
+    """
+    original: Callable[[Template, Context], SafeString]
+    original = Template._render  # type: ignore [attr-defined]
+    if getattr(original, "records_templates", False):
+        return
+
+    def _render(self: Template, context: Context) -> SafeString:
+        templates = rendered_templates.get()
+        if templates is not None and self.origin.loader is not None:
+            templates.add(self.origin.name)
+        return original(self, context)
+
+    _render.records_templates = True  # type: ignore [attr-defined]
+    Template._render = _render  # type: ignore [attr-defined]
+
+
+@cache
+def insert_before_pattern(charset: str) -> re.Pattern[bytes]:
+    # The tag contains no special characters, even encoded, so needs no
+    # escaping.
+    return re.compile(encode_fragment("</body>", charset), flags=re.IGNORECASE)
+
+
+def find_last(
+    content: bytes, pattern: re.Pattern[bytes], *, tail_only: bool = False
+) -> int | None:
+    """
+    Return the start index of the last match of pattern in content, or None.
+
+    The closing tag is normally near the end, so search windows backwards from
+    the end rather than scanning the whole content. With tail_only, give up
+    after the first window.
+    """
+    # Overlap windows so a match across their boundary is still found.
+    overlap = len(pattern.pattern) - 1
+    end = len(content)
+    while True:
+        start = max(end - SEARCH_WINDOW, 0)
+        match = None
+        for match in pattern.finditer(content, start, end):  # noqa: B007
+            pass
+        if match is not None:
+            return match.start()
+        if start == 0 or tail_only:
+            return None
+        end = start + overlap
+
+
+class StreamInjector:
+    """
+    Inject the script before the last </body> of a streamed response.
+
+    Whether a match is the last can only be known at the end of the stream,
+    so output is held back from the latest match onwards, plus enough of the
+    tail of each chunk to find a match split between chunks. If more than
+    MAX_HELD bytes follow a match, the script is injected there, to bound
+    memory use.
+    """
+
+    MAX_HELD = 64 * 1024
+
+    def __init__(self, script: bytes, pattern: re.Pattern[bytes]) -> None:
+        self.script = script
+        self.pattern = pattern
+        # Bytes that may hold the start of a match split between chunks
+        self.overlap = len(pattern.pattern) - 1
+        self.held = b""
+        self.matched = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self.done:
+            return chunk
+
+        buffer = self.held + chunk
+        match = None
+        # A held match is at position 0, so only search after it.
+        for match in self.pattern.finditer(buffer, 1 if self.matched else 0):  # noqa: B007
+            pass
+
+        if match is not None:
+            self.matched = True
+            self.held = buffer[match.start() :]
+            return buffer[: match.start()]
+        elif self.matched:
+            if len(buffer) > self.MAX_HELD:
+                self.done = True
+                self.held = b""
+                return self.script + buffer
+            self.held = buffer
+            return b""
+        else:
+            split = max(len(buffer) - self.overlap, 0)
+            self.held = buffer[split:]
+            return buffer[:split]
+
+    def finish(self) -> bytes:
+        held = self.held
+        self.held = b""
+        if self.matched and not self.done:
+            self.done = True
+            return self.script + held
+        return held
+
+    def wrap(self, content: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in content:
+            output = self.feed(chunk)
+            if output:
+                yield output
+        output = self.finish()
+        if output:
+            yield output
+
+    async def wrap_async(self, content: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in content:
+            output = self.feed(chunk)
+            if output:
+                yield output
+        output = self.finish()
+        if output:
+            yield output
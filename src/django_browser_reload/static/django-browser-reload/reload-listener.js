@@ -4,25 +4,410 @@
   const dataset = document.currentScript.dataset
   const workerScriptPath = dataset.workerScriptPath
   const eventsPath = dataset.eventsPath
+  const softReloads = dataset.softReload !== undefined
+  // Versioned with the messages between tabs and the worker, so tabs don't
+  // connect to a worker from an older version, still running in other tabs.
+  const workerName = 'django-browser-reload-2'
+  // With scoped reloads, the template files this page was rendered with.
+  let templates = dataset.templates ? new Set(JSON.parse(dataset.templates)) : null
 
-  if (!window.SharedWorker) {
-    console.debug('😭 django-browser-reload cannot work in this browser.')
-  } else {
-    const worker = new SharedWorker(workerScriptPath, {
-      name: 'django-browser-reload'
+  if (templates !== null) {
+    // Keep more resource timings, to check static file changes against.
+    performance.setResourceTimingBufferSize(10000)
+  }
+
+  const urlKey = (url) => {
+    const parsed = new URL(url, location.href)
+    return parsed.origin + parsed.pathname
+  }
+
+  const usesResource = (url) => {
+    const key = urlKey(url)
+    return performance
+      .getEntriesByType('resource')
+      .some((entry) => urlKey(entry.name) === key)
+  }
+
+  // Whether any of the given changes might affect this page.
+  const affectedBy = (changes) => {
+    if (templates === null || !Array.isArray(changes)) {
+      return true
+    }
+    return changes.some((change) => {
+      if (change.kind === 'template') {
+        return templates.has(change.path)
+      } else if (change.kind === 'static') {
+        return usesResource(change.url)
+      }
+      // Other changes, such as to Jinja templates, cannot be checked.
+      return true
     })
+  }
+
+  // Swap linked stylesheets with the given URLs for fresh copies, returning
+  // whether any were found.
+  const swapStyleSheets = (paths) => {
+    const targets = new Set(paths.map(urlKey))
+    let swapped = false
+
+    for (const link of document.querySelectorAll('link[rel~="stylesheet"][href]')) {
+      if (!targets.has(urlKey(link.href))) {
+        continue
+      }
+
+      const url = new URL(link.href)
+      url.searchParams.set('django-browser-reload', Date.now())
+      const newLink = link.cloneNode()
+      newLink.href = url.href
+      // Keep the old stylesheet until the new one loads, to avoid a flash of
+      // unstyled content.
+      newLink.addEventListener('load', () => link.remove())
+      newLink.addEventListener('error', () => link.remove())
+      link.after(newLink)
+      swapped = true
+    }
+
+    return swapped
+  }
+
+  // The scripts and stylesheets a document uses, which a soft reload can't
+  // update.
+  const assetsKey = (doc) =>
+    JSON.stringify(
+      Array.from(
+        doc.querySelectorAll('script, link[rel~="stylesheet"], style'),
+        (node) => {
+          if (node.src) {
+            return urlKey(node.src)
+          } else if (node.href) {
+            return urlKey(node.href)
+          }
+          return node.textContent
+        }
+      )
+    )
+
+  const sameKind = (from, to) =>
+    from.nodeType === to.nodeType &&
+    from.nodeName === to.nodeName &&
+    (from.nodeType !== Node.ELEMENT_NODE || from.id === to.id)
+
+  // Update a node in place to match one from another document.
+  const morph = (from, to) => {
+    if (from.nodeType !== Node.ELEMENT_NODE) {
+      if (from.nodeValue !== to.nodeValue) {
+        from.nodeValue = to.nodeValue
+      }
+      return
+    }
+    // Scripts and stylesheets are unchanged, as checked by assetsKey(), so
+    // keep them as they are, to avoid running scripts again, or undoing
+    // stylesheet swaps.
+    if (from.nodeName === 'SCRIPT' || from.nodeName === 'LINK') {
+      return
+    }
+
+    for (const { name } of Array.from(from.attributes)) {
+      if (!to.hasAttribute(name)) {
+        from.removeAttribute(name)
+      }
+    }
+    for (const { name, value } of Array.from(to.attributes)) {
+      if (from.getAttribute(name) !== value) {
+        from.setAttribute(name, value)
+      }
+    }
+
+    const fromChildren = Array.from(from.childNodes)
+    const toChildren = Array.from(to.childNodes)
+    toChildren.forEach((toChild, index) => {
+      const fromChild = fromChildren[index]
+      if (fromChild === undefined) {
+        from.appendChild(document.importNode(toChild, true))
+      } else if (sameKind(fromChild, toChild)) {
+        morph(fromChild, toChild)
+      } else {
+        fromChild.replaceWith(document.importNode(toChild, true))
+      }
+    })
+    fromChildren.slice(toChildren.length).forEach((child) => child.remove())
+  }
+
+  // Fetch the page again and morph the current document to match it, keeping
+  // scripts and client state. Fall back to a full reload if that can't work.
+  const softReload = async () => {
+    let doc
+    try {
+      const response = await fetch(location.href, {
+        cache: 'no-store',
+        headers: { Accept: 'text/html' }
+      })
+      const contentType = response.headers.get('content-type') || ''
+      if (
+        !response.ok ||
+        response.redirected ||
+        !contentType.startsWith('text/html')
+      ) {
+        throw new Error('Unexpected response')
+      }
+      doc = new DOMParser().parseFromString(await response.text(), 'text/html')
+    } catch {
+      location.reload()
+      return
+    }
+
+    if (assetsKey(doc) !== assetsKey(document)) {
+      location.reload()
+      return
+    }
+
+    morph(document.documentElement, doc.documentElement)
+
+    const script = doc.querySelector('script[data-worker-script-path]')
+    if (templates !== null && script && script.dataset.templates) {
+      templates = new Set(JSON.parse(script.dataset.templates))
+    }
+    console.debug('✨ django-browser-reload soft reloaded.')
+  }
+
+  // Reload, softly if enabled and only templates changed.
+  const reload = (changes) => {
+    if (
+      softReloads &&
+      Array.isArray(changes) &&
+      changes.length > 0 &&
+      changes.every(
+        (change) => change.kind === 'template' || change.kind === 'jinja'
+      )
+    ) {
+      softReload()
+    } else {
+      location.reload()
+    }
+  }
+
+  // Whether a reload was received while hidden, deferred until the page is
+  // shown, and its changes, or null if any were unknown.
+  let reloadPending = false
+  let deferredChanges = null
 
-    worker.port.addEventListener('message', (event) => {
-      if (event.data === 'Reload') {
-        location.reload()
+  const mergeChanges = (a, b) => {
+    if (a === null || b === null) {
+      return null
+    }
+    return a.concat(b)
+  }
+
+  // Reload now, or when next shown if hidden, to avoid loading the server
+  // with pages nobody is looking at.
+  const requestReload = (changes) => {
+    // Without a list of changes, they're unknown, so reload fully.
+    const known = Array.isArray(changes) ? changes : null
+    if (document.visibilityState === 'hidden') {
+      deferredChanges = reloadPending
+        ? mergeChanges(deferredChanges, known)
+        : known
+      reloadPending = true
+    } else {
+      reload(known)
+    }
+  }
+
+  const leaderKey = 'django-browser-reload-leader'
+  const heartbeatMs = 1000
+  const leaderExpiryMs = 5000
+
+  const storageAvailable = () => {
+    try {
+      localStorage.getItem(leaderKey)
+      return true
+    } catch {
+      return false
+    }
+  }
+
+  // Elect a leader through a claim in localStorage, which the leader renews
+  // every heartbeat. Other tabs claim it once it expires, and lead if their
+  // claim is still in place a heartbeat later, as tabs claiming at the same
+  // time overwrite each other. A leader that finds its claim taken, such as
+  // after its timers were throttled in the background, steps down.
+  const electByStorage = (lead, stepDown) => {
+    const id = Math.random().toString(36).slice(2)
+    let leading = false
+    let timer = null
+
+    const readClaim = () => {
+      try {
+        return JSON.parse(localStorage.getItem(leaderKey))
+      } catch {
+        return null
+      }
+    }
+
+    const claim = () => {
+      try {
+        localStorage.setItem(leaderKey, JSON.stringify({ id, time: Date.now() }))
+      } catch {
+        // Storage is full or disabled, so leave the claim to other tabs.
+      }
+    }
+
+    const tick = () => {
+      const current = readClaim()
+      if (current !== null && current.id === id) {
+        if (!leading) {
+          leading = true
+          lead()
+        }
+        claim()
+      } else if (leading) {
+        leading = false
+        stepDown()
+      } else if (current === null || Date.now() - current.time > leaderExpiryMs) {
+        claim()
+      }
+    }
+
+    const start = () => {
+      tick()
+      timer = setInterval(tick, heartbeatMs)
+    }
+    start()
+
+    addEventListener('storage', (event) => {
+      // Take over promptly when the leader closes.
+      if (event.key === leaderKey && event.newValue === null && !leading) {
+        claim()
+      }
+    })
+    addEventListener('pagehide', () => {
+      clearInterval(timer)
+      if (leading) {
+        leading = false
+        stepDown()
+        localStorage.removeItem(leaderKey)
+      }
+    })
+    addEventListener('pageshow', (event) => {
+      // Restored from the back/forward cache
+      if (event.persisted) {
+        start()
       }
     })
+  }
+
+  const handleMessage = (event) => {
+    if (event.data.type === 'Reload') {
+      if (affectedBy(event.data.changes)) {
+        requestReload(event.data.changes)
+      }
+    } else if (event.data.type === 'StyleSheets') {
+      // Stylesheets might be imported by others, so reload if none matched.
+      if (
+        !swapStyleSheets(event.data.paths) &&
+        affectedBy(event.data.changes)
+      ) {
+        requestReload(event.data.changes)
+      }
+    }
+  }
 
-    worker.port.postMessage({
+  const visibility = () => ({
+    visible: document.visibilityState === 'visible',
+    focused: document.hasFocus()
+  })
+
+  let postToWorker
+
+  const initialize = () => {
+    postToWorker({
       type: 'initialize',
-      eventsPath
+      eventsPath,
+      ...visibility()
     })
+  }
 
+  if (window.SharedWorker) {
+    const worker = new SharedWorker(workerScriptPath, {
+      name: workerName
+    })
+    worker.port.addEventListener('message', handleMessage)
     worker.port.start()
+    postToWorker = (message) => worker.port.postMessage(message)
+    initialize()
+  } else if (
+    window.Worker &&
+    window.BroadcastChannel &&
+    (navigator.locks || storageAvailable())
+  ) {
+    // Without SharedWorker, tabs elect a leader. The leader runs the worker
+    // as a dedicated Worker and relays its messages to the other tabs over a
+    // BroadcastChannel, so the browser still keeps one connection to the
+    // server.
+    const channel = new BroadcastChannel('django-browser-reload')
+    channel.addEventListener('message', handleMessage)
+    postToWorker = () => {}
+    let worker = null
+
+    const lead = () => {
+      channel.removeEventListener('message', handleMessage)
+      worker = new Worker(workerScriptPath, {
+        name: workerName
+      })
+      worker.addEventListener('message', (event) => {
+        channel.postMessage(event.data)
+        handleMessage(event)
+      })
+      postToWorker = (message) => worker.postMessage(message)
+      initialize()
+    }
+
+    const stepDown = () => {
+      worker.terminate()
+      worker = null
+      postToWorker = () => {}
+      channel.addEventListener('message', handleMessage)
+    }
+
+    if (navigator.locks) {
+      // The lock is held until the leader closes, then granted to the next
+      // waiting tab.
+      navigator.locks.request('django-browser-reload', () => {
+        lead()
+        return new Promise(() => {})
+      })
+    } else {
+      // Web Locks need a secure context, so over plain HTTP, such as to a
+      // LAN IP address, elect through localStorage instead.
+      electByStorage(lead, stepDown)
+    }
+  } else {
+    console.debug('😭 django-browser-reload cannot work in this browser.')
+    postToWorker = () => {}
+  }
+
+  const reportVisibility = () => {
+    postToWorker({ type: 'visibility', ...visibility() })
   }
+  addEventListener('focus', reportVisibility)
+  addEventListener('blur', reportVisibility)
+  document.addEventListener('visibilitychange', () => {
+    reportVisibility()
+    if (document.visibilityState === 'visible' && reloadPending) {
+      const changes = deferredChanges
+      reloadPending = false
+      deferredChanges = null
+      reload(changes)
+    }
+  })
+
+  addEventListener('pagehide', () => {
+    postToWorker({ type: 'disconnect' })
+  })
+  addEventListener('pageshow', (event) => {
+    // Restored from the back/forward cache
+    if (event.persisted) {
+      initialize()
+    }
+  })
 }
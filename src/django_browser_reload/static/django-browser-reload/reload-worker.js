@@ -2,28 +2,91 @@
 'use strict'
 
 let eventsPath = null
-let port = null
+// Connected tabs, in order of when they were last loaded, with their
+// visibility and focus as last reported.
+let tabs = []
+// Delay between reloading visible tabs, so their page requests don't all hit
+// the server at once.
+const staggerMs = 250
 let currentVersionId = null
 let eventSource = null
+// Set when the server asks for long-polling instead of an EventSource.
+let pollPath = null
+let pollCursor = null
+let pollId = 0
 
 addEventListener('connect', (event) => {
-  // Only keep one active port, for whichever tab was last loaded.
-  if (port) {
-    port.close()
-  }
-  port = event.ports[0]
-  port.addEventListener('message', receiveMessage)
+  const port = event.ports[0]
+  port.addEventListener('message', (event) => receiveMessage(port, event))
   port.start()
 })
 
-const receiveMessage = (event) => {
-  if (event.data.type === 'initialize') {
+if (self.SharedWorkerGlobalScope === undefined) {
+  // Run as a dedicated Worker by the leader tab, in browsers without
+  // SharedWorker. The worker scope acts as the port to that single tab.
+  addEventListener('message', (event) => receiveMessage(self, event))
+}
+
+const removeTab = (port) => {
+  tabs = tabs.filter((tab) => tab.port !== port)
+}
+
+const tabRank = (tab) => {
+  if (tab.focused) {
+    return 0
+  } else if (tab.visible) {
+    return 1
+  }
+  return 2
+}
+
+// Message every tab. With stagger, message the focused tab first, then other
+// visible tabs one at a time. Hidden tabs defer reloading until they're
+// shown, so message them straight away.
+const postToTabs = (message, { stagger = false } = {}) => {
+  const ordered = tabs
+    .slice()
+    .reverse()
+    .sort((a, b) => tabRank(a) - tabRank(b))
+  let delay = 0
+  ordered.forEach((tab, index) => {
+    if (!stagger || index === 0 || !tab.visible) {
+      tab.port.postMessage(message)
+    } else {
+      delay += staggerMs
+      setTimeout(() => tab.port.postMessage(message), delay)
+    }
+  })
+}
+
+const updateTab = (port, state) => {
+  const tab = tabs.find((tab) => tab.port === port)
+  if (tab) {
+    tab.visible = state.visible
+    tab.focused = state.focused
+  }
+}
+
+const receiveMessage = (port, event) => {
+  if (event.data.type === 'disconnect') {
+    removeTab(port)
+  } else if (event.data.type === 'visibility') {
+    updateTab(port, event.data)
+  } else if (event.data.type === 'initialize') {
+    removeTab(port)
+    tabs.push({
+      port,
+      visible: event.data.visible,
+      focused: event.data.focused
+    })
+
     const givenEventsPath = event.data.eventsPath
 
     if (givenEventsPath !== eventsPath) {
       if (eventSource) {
         eventSource.close()
       }
+      stopPolling()
 
       resetConnectTimeout()
 
@@ -91,22 +154,95 @@ const connectToEvents = () => {
 
     const message = JSON.parse(event.data)
 
-    if (message.type === 'ping') {
-      if (currentVersionId !== null && currentVersionId !== message.versionId) {
-        console.debug('🔁 django-browser-reload triggering reload.')
-        port.postMessage('Reload')
-      }
-
-      currentVersionId = message.versionId
-    } else if (message.type === 'reload') {
-      port.postMessage('Reload')
+    if (message.type === 'transport') {
+      eventSource.close()
+      eventSource = null
+      startPolling(message.url, message.cursor)
+    } else {
+      handleMessage(message)
     }
   })
 
   eventSource.addEventListener('error', () => {
+    bumpConnectTimeout()
+    // After a dropped connection, the browser reconnects by itself, after the
+    // delay from the server's 'retry' field. Leave short drops to that, but
+    // once errors persist past the first step of backing off, such as when
+    // the server has stopped, back off as for outright failures.
+    if (
+      eventSource.readyState === EventSource.CONNECTING &&
+      connectTimeoutMs === 100
+    ) {
+      return
+    }
     eventSource.close()
     eventSource = null
-    bumpConnectTimeout()
     setTimeout(connectToEvents, connectTimeoutMs)
   })
 }
+
+const handleMessage = (message) => {
+  if (message.type === 'ping') {
+    if (currentVersionId !== null && currentVersionId !== message.versionId) {
+      console.debug('🔁 django-browser-reload triggering reload.')
+      postToTabs({ type: 'Reload', changes: null }, { stagger: true })
+    }
+
+    currentVersionId = message.versionId
+  } else if (message.type === 'reload') {
+    // Changes are null when unknown, such as after missed messages, which
+    // means a full reload.
+    postToTabs(
+      { type: 'Reload', changes: message.changes ?? null },
+      { stagger: true }
+    )
+  } else if (message.type === 'css') {
+    postToTabs({
+      type: 'StyleSheets',
+      paths: message.paths,
+      changes: message.changes ?? null
+    })
+  }
+}
+
+const startPolling = (path, cursor) => {
+  pollPath = path
+  pollCursor = cursor
+  pollId++
+  const id = pollId
+  setTimeout(() => pollForEvents(id), 0)
+}
+
+const stopPolling = () => {
+  pollPath = null
+  pollId++
+}
+
+const pollForEvents = async (id) => {
+  let data
+  try {
+    const url = pollPath + '?cursor=' + encodeURIComponent(pollCursor)
+    const response = await fetch(url, { cache: 'no-store' })
+    if (!response.ok) {
+      throw new Error('Unexpected status ' + response.status)
+    }
+    data = await response.json()
+  } catch {
+    if (id === pollId) {
+      bumpConnectTimeout()
+      setTimeout(() => pollForEvents(id), connectTimeoutMs)
+    }
+    return
+  }
+
+  // Stop if the events path changed while waiting.
+  if (id !== pollId) {
+    return
+  }
+
+  resetConnectTimeout()
+  pollCursor = data.cursor
+  handleMessage({ type: 'ping', versionId: data.versionId })
+  data.messages.forEach(handleMessage)
+  setTimeout(() => pollForEvents(id), 0)
+}
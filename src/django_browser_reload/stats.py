@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from django.dispatch import Signal
+
+# Sent at each stage of the reload pipeline, with the stage name, a
+# time.monotonic() timestamp, and details for the stage. Stages:
+#
+# * file_changed - the autoreloader reported a change, with file_path.
+# * file_skipped - a changed file won't trigger a reload, with file_path and
+#   reason: "unwatched", "ignored", or "unchanged".
+# * change_scheduled - a change was passed to the debouncer, with change.
+# * reload_sent - a debounced batch was sent to events streams, with changes.
+# * message_delivered - an events stream or poll delivered messages, with
+#   count.
+# * response_injected - the middleware inserted the script, with size, the
+#   number of bytes added.
+# * response_stream_wrapped - the middleware wrapped a streaming response to
+#   insert the script.
+# * response_skipped - the middleware did not insert the script into an HTML
+#   response, with reason: "encoded", "sized_stream", or "no_body".
+reload_stage = Signal()
+
+lock = threading.Lock()
+counters: Counter[str] = Counter()
+
+
+def record(stage: str, **kwargs: Any) -> None:
+    """
+    Count a stage of the reload pipeline, and send reload_stage for it.
+    Django logs errors from receivers, rather than letting them break the
+    pipeline.
+    """
+    timestamp = time.monotonic()
+    with lock:
+        counters[stage] += 1
+    reload_stage.send_robust(sender=None, stage=stage, timestamp=timestamp, **kwargs)
+
+
+def increment(name: str, amount: int = 1) -> None:
+    with lock:
+        counters[name] += amount
+
+
+def snapshot() -> dict[str, int]:
+    with lock:
+        return dict(counters)
+
+
+def reset() -> None:
+    with lock:
+        counters.clear()
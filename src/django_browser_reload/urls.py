@@ -8,4 +8,6 @@ app_name = "django_browser_reload"
 
 urlpatterns = [
     path("events/", views.events, name="events"),
+    path("poll/", views.poll, name="poll"),
+    path("stats/", views.stats_view, name="stats"),
 ]
@@ -1,12 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
+import logging
+import math
+import os
+import sys
 import threading
-from collections.abc import AsyncGenerator, Callable, Generator
+import time
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import AsyncGenerator, Callable, Generator, Hashable
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from functools import lru_cache
 from http import HTTPStatus
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Generic, Literal, NamedTuple, TypeVar
+
+if sys.platform != "win32":
+    import fcntl
 
 import django
 from django.conf import settings
@@ -17,37 +32,450 @@ from django.contrib.staticfiles.finders import (
 )
 from django.core.files.storage import FileSystemStorage
 from django.core.handlers.asgi import ASGIRequest
+from django.core.signals import setting_changed
 from django.dispatch import receiver
-from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.http.response import HttpResponseBase
-from django.template import engines
+from django.template import Template, TemplateDoesNotExist, engines
 from django.template.autoreload import (
     get_template_directories as django_template_directories,
 )
 from django.template.backends.base import BaseEngine
+from django.template.backends.django import DjangoTemplates
+from django.templatetags.static import static
+from django.urls import reverse
 from django.utils.autoreload import BaseReloader, autoreload_started, file_changed
 from django.utils.crypto import get_random_string
 
+from django_browser_reload import stats
+from django_browser_reload.inotify import InotifyWatcher
+
+logger = logging.getLogger("django_browser_reload")
+
 # For detecting when Python has reloaded, use a random version ID in memory.
 # When the worker receives a different version from the one it saw previously,
 # it reloads.
 version_id = get_random_string(32)
 
-# Communicate template changes to the running polls thread
-should_reload_event = threading.Event()
+T = TypeVar("T", bound=Hashable)
 
-reload_timer: threading.Timer | None = None
 
-RELOAD_DEBOUNCE_TIME = 0.05  # seconds
+class ReloadHub:
+    """
+    Broadcast event stream messages to every connected events stream.
+
+    Each published message increments a generation counter. Subscribers
+    remember the last generation they delivered, so every stream sees each
+    message exactly once. Only the latest HISTORY_SIZE messages are kept,
+    subscribers that fall further behind receive a plain reload instead, so
+    memory use is bounded.
+
+    With a shared channel, the hub follows the channel's ID and generation,
+    so cursors are valid in every process using it.
+    """
+
+    HISTORY_SIZE = 32
+
+    def __init__(self) -> None:
+        # Distinguishes cursors from other processes or server restarts.
+        self.id = get_random_string(12)
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.history: deque[bytes] = deque(maxlen=self.HISTORY_SIZE)
+        self.subscribers: weakref.WeakSet[Subscriber] = weakref.WeakSet()
+
+    def publish(self, data: bytes, generation: int | None = None) -> None:
+        """
+        Publish a message, at the given generation if it comes from a shared
+        channel.
+        """
+        with self.condition:
+            if generation is None:
+                generation = self.generation + 1
+            elif generation <= self.generation:
+                # Superseded by a later message, which subscribers still
+                # behind this one receive as a plain reload.
+                return
+            elif generation > self.generation + 1:
+                # Messages were skipped, so subscribers behind must reload.
+                self.history.clear()
+            self.generation = generation
+            self.history.append(data)
+            self.condition.notify_all()
+            for subscriber in self.subscribers:
+                subscriber.notify_loop()
+
+    def subscribe(self) -> Subscriber:
+        with self.condition:
+            subscriber = Subscriber(self)
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self.condition:
+            self.subscribers.discard(subscriber)
+
+    def follow(self, id: str, generation: int) -> None:
+        """
+        Continue from a shared channel's ID and generation, renumbering
+        subscribers so none miss or repeat messages.
+        """
+        with self.condition:
+            offset = generation - self.generation
+            self.id = id
+            self.generation = generation
+            for subscriber in self.subscribers:
+                subscriber.generation += offset
+
+    def cursor(self, generation: int) -> str:
+        """
+        Return an opaque cursor for resuming from the given generation.
+        """
+        return f"{self.id}-{generation}"
+
+    def resume(self, cursor: str) -> Subscriber | None:
+        """
+        Return an unregistered subscriber continuing from a cursor, for
+        long-polling, or None if the cursor is not valid for this hub.
+        """
+        hub_id, _, generation = cursor.partition("-")
+        if (
+            hub_id != self.id
+            or not generation.isdigit()
+            or int(generation) > self.generation
+        ):
+            return None
+        return Subscriber(self, generation=int(generation))
+
+
+class Subscriber:
+    def __init__(self, hub: ReloadHub, generation: int | None = None) -> None:
+        self.hub = hub
+        self.generation = hub.generation if generation is None else generation
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.async_event: asyncio.Event | None = None
+
+    def bind_loop(self) -> None:
+        """
+        Bind to the running event loop, so that wait_async() is woken by
+        messages published from other threads.
+        """
+        with self.hub.condition:
+            self.loop = asyncio.get_running_loop()
+            self.async_event = asyncio.Event()
+
+    def notify_loop(self) -> None:
+        # Called with the hub's condition held.
+        if self.loop is None:
+            return
+        assert self.async_event is not None
+        try:
+            self.loop.call_soon_threadsafe(self.async_event.set)
+        except RuntimeError:  # pragma: no cover
+            # Loop closed
+            pass
+
+    def poll(self) -> list[bytes]:
+        """
+        Return pending messages, marking them as delivered.
+        """
+        with self.hub.condition:
+            return self._consume()
+
+    def wait(self, timeout: float) -> list[bytes]:
+        """
+        Wait up to timeout seconds for messages, marking them as delivered.
+        """
+        with self.hub.condition:
+            self.hub.condition.wait_for(
+                lambda: self.hub.generation != self.generation, timeout
+            )
+            return self._consume()
+
+    async def wait_async(self, timeout: float) -> list[bytes]:
+        """
+        Wait up to timeout seconds for messages without blocking the event
+        loop, marking them as delivered. Requires bind_loop() first.
+        """
+        assert self.loop is not None
+        assert self.async_event is not None
+        deadline = self.loop.time() + timeout
+        while True:
+            # The event may have been set for already-delivered messages.
+            self.async_event.clear()
+            messages = self.poll()
+            if messages:
+                return messages
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return []
+            try:
+                await asyncio.wait_for(self.async_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return self.poll()
+
+    def _consume(self) -> list[bytes]:
+        behind = self.hub.generation - self.generation
+        self.generation = self.hub.generation
+        if behind == 0:
+            return []
+        history = self.hub.history
+        if behind > len(history):
+            return [full_reload_message()]
+        return list(islice(history, len(history) - behind, None))
+
+
+# Communicate template changes to the running events streams
+reload_hub = ReloadHub()
+
+
+class FileChannel:
+    """
+    Share reloads and the version ID between processes through a small JSON
+    file, for servers that run several worker processes.
+
+    Messages increment a generation counter in the file, which a background
+    thread in each process polls, relaying changes to that process's hub. The
+    version ID of the first live process to use the file is shared by all of
+    them, so their pings agree.
+
+    The file also holds an ID for cursors, and the hub follows the file's
+    generation, so a long-poll can resume on any process.
+
+    Updates hold an exclusive lock on a sibling ".lock" file, so processes
+    publishing at once don't overwrite each other's generation. File locks
+    are unavailable on Windows, where only one process should publish.
+    """
+
+    version_id: str
+    generation: int
+
+    def __init__(self, path: Path, hub: ReloadHub) -> None:
+        self.path = path
+        self.lock_path = path.with_name(f"{path.name}.lock")
+        self.hub = hub
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+        with self.locked():
+            state = self.read()
+            original = dict(state)
+            owner = state.get("pid")
+            if (
+                isinstance(owner, int)
+                and isinstance(state.get("versionId"), str)
+                and _process_alive(owner)
+            ):
+                self.version_id = state["versionId"]
+            else:
+                self.version_id = version_id
+                state.update(versionId=version_id, pid=os.getpid())
+            if not isinstance(state.get("hubId"), str):
+                state["hubId"] = get_random_string(12)
+            if state != original:
+                self.write(state)
+            self.generation = state.get("generation", 0)
+            hub.follow(state["hubId"], self.generation)
 
+        self.thread = threading.Thread(
+            target=self.run, name="django-browser-reload-channel", daemon=True
+        )
+        self.thread.start()
 
-def trigger_reload_soon() -> None:
-    global reload_timer
-    if reload_timer is not None:
-        reload_timer.cancel()
+    @contextmanager
+    def locked(self) -> Generator[None]:
+        """
+        Lock the file against updates from other threads and processes.
+        """
+        with self.lock:
+            if sys.platform == "win32":  # pragma: no cover
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                # Released when the file is closed.
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
 
-    reload_timer = threading.Timer(RELOAD_DEBOUNCE_TIME, should_reload_event.set)
-    reload_timer.start()
+    def read(self) -> dict[str, Any]:
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict):
+            return {}
+        return state
+
+    def write(self, state: dict[str, Any]) -> None:
+        # Write to a temporary file and rename, so readers never see a partial
+        # file.
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(state))
+        os.replace(temp_path, self.path)
+
+    def publish(self, data: bytes) -> int:
+        """
+        Record a message for other processes to see, returning its generation.
+        """
+        with self.locked():
+            state = self.read()
+            self.generation = state.get("generation", 0) + 1
+            state["generation"] = self.generation
+            state["message"] = data.decode()
+            self.write(state)
+            return self.generation
+
+    def poll(self) -> None:
+        with self.lock:
+            state = self.read()
+            version = state.get("versionId")
+            if isinstance(version, str):
+                self.version_id = version
+            generation = state.get("generation", 0)
+            if generation == self.generation:
+                return
+            # Only the latest message is stored, so if several were missed,
+            # fall back to a full reload.
+            data = state.get("message")
+            if generation == self.generation + 1 and isinstance(data, str):
+                relayed = data.encode()
+            else:
+                relayed = full_reload_message()
+            if generation < self.generation:
+                # The file was replaced, so restart numbering to match.
+                self.hub.follow(self.hub.id, generation - 1)
+            self.generation = generation
+        self.hub.publish(relayed, generation=generation)
+
+    def run(self) -> None:
+        while not self.stopped.wait(SHARED_STATE_POLL_INTERVAL):
+            self.poll()
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":  # pragma: no cover
+        # No cheap check, so assume the process was replaced.
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # pragma: no cover
+        return True
+    return True
+
+
+SHARED_STATE_POLL_INTERVAL = 0.1  # seconds
+
+_channel: FileChannel | None = None
+_channel_lock = threading.Lock()
+
+
+def get_channel() -> FileChannel | None:
+    """
+    Return the cross-process channel configured by the
+    BROWSER_RELOAD_SHARED_STATE_FILE setting, or None if it is unset.
+    """
+    global _channel
+    path = getattr(settings, "BROWSER_RELOAD_SHARED_STATE_FILE", None)
+    with _channel_lock:
+        if _channel is not None and (path is None or _channel.path != Path(path)):
+            _channel.close()
+            _channel = None
+        if path is not None and _channel is None:
+            _channel = FileChannel(Path(path), reload_hub)
+        return _channel
+
+
+def current_version_id() -> str:
+    channel = get_channel()
+    if channel is None:
+        return version_id
+    return channel.version_id
+
+
+def broadcast(data: bytes) -> None:
+    channel = get_channel()
+    if channel is None:
+        reload_hub.publish(data)
+    else:
+        reload_hub.publish(data, generation=channel.publish(data))
+
+
+class Debouncer(Generic[T]):
+    """
+    Call a function with the items from a burst of scheduling calls, once the
+    burst has settled.
+
+    A single long-lived thread waits for a deadline that each call to
+    schedule() pushes forward, up to a ceiling measured from the first call in
+    the burst, so a stream of changes cannot postpone the call forever. With
+    no ceiling, the call waits for a quiet period however long the burst
+    lasts. Items are deduplicated, keeping the order they were first
+    scheduled.
+    """
+
+    def __init__(self, callback: Callable[[list[T]], object]) -> None:
+        self.callback = callback
+        self.condition = threading.Condition()
+        self.deadline: float | None = None
+        self.max_deadline = 0.0
+        self.pending: dict[T, None] = {}
+        self.thread: threading.Thread | None = None
+        # Counters
+        self.scheduled = 0
+        self.coalesced = 0
+        self.fired = 0
+
+    def schedule(self, item: T, delay: float, max_wait: float | None) -> None:
+        now = time.monotonic()
+        with self.condition:
+            self.scheduled += 1
+            if self.deadline is None:
+                self.max_deadline = math.inf if max_wait is None else now + max_wait
+            else:
+                self.coalesced += 1
+            self.deadline = min(now + delay, self.max_deadline)
+            self.pending[item] = None
+
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run,
+                    name="django-browser-reload-debouncer",
+                    daemon=True,
+                )
+                self.thread.start()
+            self.condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.deadline is None:
+                    self.condition.wait()
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                self.deadline = None
+                self.fired += 1
+                items = list(self.pending)
+                self.pending = {}
+            try:
+                self.callback(items)
+            except Exception:
+                # Keep the thread alive for later bursts.
+                logger.exception("Error in debounced callback")
 
 
 def jinja_template_directories() -> set[Path]:
@@ -88,41 +516,469 @@ def static_finder_storages() -> Generator[FileSystemStorage]:
         yield from finder.storages.values()
 
 
+RootKind = Literal["template", "jinja", "static"]
+
+
+class WatchedRoot(NamedTuple):
+    path: Path
+    kind: RootKind
+    # For static roots, the prefix their files are served under
+    prefix: str = ""
+
+
+# Index of watched root directories, built on first use.
+_watched_roots: dict[Path, WatchedRoot] | None = None
+
+# Settings that affect which directories the index contains.
+WATCHED_ROOTS_SETTINGS = frozenset(
+    {
+        "INSTALLED_APPS",
+        "STATICFILES_DIRS",
+        "STATICFILES_FINDERS",
+        "TEMPLATES",
+    }
+)
+
+
+def watched_roots() -> dict[Path, WatchedRoot]:
+    """
+    Return the mapping of watched root directories to their details.
+
+    Computing the roots means iterating all template engines and static file
+    finders, so the result is cached until a relevant setting changes. Where a
+    directory is used for several purposes, the first kind wins, in the order
+    Django templates, Jinja templates, static files.
+    """
+    global _watched_roots
+    if _watched_roots is None:
+        roots: dict[Path, WatchedRoot] = {}
+        for directory in django_template_directories():
+            roots.setdefault(directory, WatchedRoot(directory, "template"))
+        for directory in jinja_template_directories():
+            roots.setdefault(directory, WatchedRoot(directory, "jinja"))
+        for storage in static_finder_storages():
+            directory = Path(storage.location)
+            prefix = getattr(storage, "prefix", None) or ""
+            roots.setdefault(directory, WatchedRoot(directory, "static", prefix))
+        _watched_roots = roots
+    return _watched_roots
+
+
+def clear_watched_roots() -> None:
+    global _watched_roots
+    _watched_roots = None
+
+
+@receiver(setting_changed, dispatch_uid="browser_reload_watched_roots")
+def on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    if setting in WATCHED_ROOTS_SETTINGS:
+        clear_watched_roots()
+
+
+def classify_path(file_path: Path) -> WatchedRoot | None:
+    """
+    Return the nearest watched root containing the given path, or None if it
+    is not within any. Costs one dict lookup per path component.
+    """
+    roots = watched_roots()
+    for parent in file_path.parents:
+        root = roots.get(parent)
+        if root is not None:
+            return root
+    return None
+
+
+class Change(NamedTuple):
+    path: Path
+    root: WatchedRoot
+
+    def static_url(self) -> str:
+        name = self.path.relative_to(self.root.path).as_posix()
+        if self.root.prefix:
+            name = f"{self.root.prefix}/{name}"
+        return static(name)
+
+    def as_json(self) -> dict[str, str]:
+        """
+        Describe the change for listeners, to check if their page uses it.
+        """
+        data = {"kind": self.root.kind, "path": str(self.path)}
+        if self.root.kind == "static":
+            data["url"] = self.static_url()
+        return data
+
+
+def reload_message(
+    changes: list[Change], errors: dict[Path, str] | None = None
+) -> bytes:
+    """
+    Return one message for a batch of changes, listing each changed file,
+    with any errors from compiling changed templates.
+    """
+    changes_json = [change.as_json() for change in changes]
+    if errors:
+        for change, data in zip(changes, changes_json):
+            if change.path in errors:
+                data["error"] = errors[change.path]
+    # Stylesheets can be swapped in place, without reloading the page.
+    if changes and all(
+        change.root.kind == "static" and change.path.suffix == ".css"
+        for change in changes
+    ):
+        return message(
+            "css",
+            paths=[change.static_url() for change in changes],
+            changes=changes_json,
+        )
+    return message("reload", changes=changes_json)
+
+
+def send_reload(changes: list[Change]) -> None:
+    errors = None
+    if getattr(settings, "BROWSER_RELOAD_PREWARM_TEMPLATES", False):
+        errors = prewarm_templates(changes)
+    stats.record("reload_sent", changes=changes)
+    broadcast(reload_message(changes, errors))
+
+
+reload_debouncer = Debouncer(send_reload)
+
+RELOAD_DEBOUNCE_TIME = 0.05  # seconds
+RELOAD_MAX_WAIT_TIME = 1.0  # seconds
+
+
+def trigger_reload_soon(change: Change) -> None:
+    stats.record("change_scheduled", change=change)
+    reload_debouncer.schedule(
+        change,
+        delay=getattr(settings, "BROWSER_RELOAD_DEBOUNCE_TIME", RELOAD_DEBOUNCE_TIME),
+        max_wait=getattr(
+            settings, "BROWSER_RELOAD_DEBOUNCE_MAX_WAIT_TIME", RELOAD_MAX_WAIT_TIME
+        ),
+    )
+
+
+# Static files that cannot affect a page, or directories too large to watch
+STATIC_IGNORE_PATTERNS = [".*", "*~", "*.map", "__pycache__", "node_modules"]
+
+
+def static_ignore_patterns() -> list[str]:
+    return getattr(
+        settings, "BROWSER_RELOAD_STATIC_IGNORE_PATTERNS", STATIC_IGNORE_PATTERNS
+    )
+
+
+def static_include_patterns() -> list[str] | None:
+    return getattr(settings, "BROWSER_RELOAD_STATIC_INCLUDE_PATTERNS", None)
+
+
+def is_static_ignored(name: str) -> bool:
+    return any(fnmatch(name, pattern) for pattern in static_ignore_patterns())
+
+
+def is_static_included(file_path: Path, root: Path) -> bool:
+    """
+    Return whether a static file should be watched. It must have no path
+    component, relative to its root, matching an ignore pattern, and its name
+    must match an include pattern, if any are set.
+    """
+    parts = file_path.relative_to(root).parts
+    ignore_patterns = static_ignore_patterns()
+    if any(fnmatch(part, pattern) for part in parts for pattern in ignore_patterns):
+        return False
+    include_patterns = static_include_patterns()
+    return include_patterns is None or any(
+        fnmatch(parts[-1], pattern) for pattern in include_patterns
+    )
+
+
+def static_watch_globs(directory: Path) -> list[tuple[Path, str]]:
+    """
+    Return (directory, glob) pairs to watch the given static directory with.
+
+    Reloaders like StatReloader walk every file matching a recursive glob on
+    each tick, so ignored directories must not be inside any. Directories with
+    no ignored directories beneath them are watched recursively, others have
+    only their direct files watched, and their subdirectories handled in turn.
+    """
+    ignore_patterns = static_ignore_patterns()
+    file_globs = static_include_patterns() or ["*"]
+
+    def walk(directory: Path) -> tuple[bool, list[tuple[Path, str]]]:
+        # Return whether the directory contains no ignored directories, and
+        # the globs to watch it with if it does.
+        clean = True
+        globs: list[tuple[Path, str]] = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            if any(fnmatch(entry.name, pattern) for pattern in ignore_patterns):
+                clean = False
+                continue
+            subdirectory = Path(entry.path)
+            if entry.is_symlink():
+                # Don't risk following symlink loops.
+                globs.extend((subdirectory, f"**/{glob}") for glob in file_globs)
+                continue
+            child_clean, child_globs = walk(subdirectory)
+            if child_clean:
+                globs.extend((subdirectory, f"**/{glob}") for glob in file_globs)
+            else:
+                clean = False
+                globs.extend(child_globs)
+
+        globs.extend((directory, glob) for glob in file_globs)
+        return clean, globs
+
+    clean, globs = walk(directory)
+    if clean:
+        return [(directory, f"**/{glob}") for glob in file_globs]
+    return globs
+
+
+class FingerprintCache:
+    """
+    Remember fingerprints of changed files, to detect writes that leave a
+    file's content the same, such as from formatters or bundlers.
+
+    A file with the same size and modification time as last seen is assumed
+    unchanged, otherwise its content is hashed and compared. Entries are
+    evicted least recently used first, beyond maxsize. A file's first change
+    always counts as a change, as its earlier content is unknown.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[Path, tuple[int, int, bytes]] = OrderedDict()
+        # Counters, of unchanged and changed files
+        self.hits = 0
+        self.misses = 0
+
+    def changed(self, path: Path) -> bool:
+        try:
+            stat = path.stat()
+            with self.lock:
+                cached = self.entries.get(path)
+                if cached is not None and cached[:2] == (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    self.entries.move_to_end(path)
+                    self.hits += 1
+                    return False
+            digest = file_digest(path)
+        except OSError:
+            # Deleted or unreadable
+            with self.lock:
+                self.entries.pop(path, None)
+                self.misses += 1
+            return True
+
+        with self.lock:
+            self.entries[path] = (stat.st_size, stat.st_mtime_ns, digest)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            if cached is not None and cached[2] == digest:
+                self.hits += 1
+                return False
+            self.misses += 1
+            return True
+
+
+def file_digest(path: Path) -> bytes:
+    hasher = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+file_fingerprints = FingerprintCache(maxsize=4096)
+
+
+def evict_templates(file_path: Path) -> None:
+    """
+    Evict cached templates compiled from the given file, from Django template
+    cached loaders and Jinja environments.
+
+    Parent and included templates are looked up through the same caches at
+    render time, so evicting the changed file's own entries is enough for
+    templates that extend or include it to use the new version. Cached
+    misses are evicted too, in case the file is new.
+    """
+    from django.forms.renderers import get_default_renderer
+
+    name = str(file_path)
+    renderer_engine = getattr(get_default_renderer(), "engine", None)
+    for backend in [*engines.all(), renderer_engine]:
+        if isinstance(backend, DjangoTemplates):
+            for loader in backend.engine.template_loaders:
+                evict_cached_loader_templates(loader, name)
+        elif backend is not None and _is_jinja_backend(backend):
+            evict_jinja_templates(backend.env, name)  # type: ignore [union-attr]
+
+
+def evict_cached_loader_templates(loader: Any, name: str) -> None:
+    cache = getattr(loader, "get_template_cache", None)
+    if cache is None:
+        return
+    for key, template in list(cache.items()):
+        # Non-Template values are cached TemplateDoesNotExist errors.
+        if (
+            not isinstance(template, Template)
+            or os.path.abspath(template.origin.name) == name
+        ):
+            cache.pop(key, None)
+
+
+def evict_jinja_templates(env: Any, name: str) -> None:
+    cache = env.cache
+    if cache is None:
+        return
+    for key, template in list(cache.items()):
+        if template.filename and os.path.abspath(template.filename) == name:
+            try:
+                del cache[key]
+            except KeyError:  # pragma: no cover
+                pass
+
+
+def prewarm_templates(changes: list[Change]) -> dict[Path, str]:
+    """
+    Compile changed templates through their backends, so they are cached
+    before browsers reload and request them. Return error messages for those
+    that fail to compile.
+
+    Called from the debouncer thread, after any eviction from template caches.
+    """
+    errors = {}
+    for change in changes:
+        kind = change.root.kind
+        if kind not in ("template", "jinja"):
+            continue
+        name = change.path.relative_to(change.root.path).as_posix()
+        for backend in engines.all():
+            if kind == "template":
+                matches = isinstance(backend, DjangoTemplates)
+            else:
+                matches = _is_jinja_backend(backend)
+            if not matches:
+                continue
+            try:
+                backend.get_template(name)
+            except TemplateDoesNotExist:
+                continue
+            except Exception as exc:
+                # Such as TemplateSyntaxError, or UnicodeDecodeError for a
+                # non-text file. Report rather than stop the debouncer.
+                errors[change.path] = str(exc)
+            break
+    return errors
+
+
+inotify_watcher: InotifyWatcher | None = None
+
+
+def stop_inotify_watcher() -> None:
+    global inotify_watcher
+    if inotify_watcher is not None:
+        inotify_watcher.stop()
+        inotify_watcher = None
+
+
+def start_inotify_watcher(roots: dict[Path, WatchedRoot]) -> bool:
+    """
+    Watch the given roots with inotify, sending file_changed for changes as
+    Django's reloaders do. Return False if inotify is unavailable, or there
+    are too many directories for the user's inotify watch limit.
+    """
+    global inotify_watcher
+    stop_inotify_watcher()
+
+    try:
+        watcher = InotifyWatcher(
+            lambda path: file_changed.send(sender=watcher, file_path=path)
+        )
+    except OSError:
+        return False
+    try:
+        for directory, root in roots.items():
+            watcher.watch(
+                directory,
+                exclude=is_static_ignored if root.kind == "static" else None,
+            )
+    except OSError:
+        watcher.close()
+        return False
+
+    watcher.start()
+    inotify_watcher = watcher
+    return True
+
+
 # Signal receivers imported in AppConfig.ready() to ensure connected
 @receiver(autoreload_started, dispatch_uid="browser_reload")
 def on_autoreload_started(*, sender: BaseReloader, **kwargs: Any) -> None:
-    for directory in jinja_template_directories():
-        sender.watch_dir(directory, "**/*")
+    # Build the index afresh, as app template directories only count if they
+    # exist.
+    clear_watched_roots()
+    roots = watched_roots()
+
+    if getattr(settings, "BROWSER_RELOAD_INOTIFY", False) and start_inotify_watcher(
+        roots
+    ):
+        # Stop the reloader polling the template directories that Django
+        # registered, as inotify now covers them.
+        for directory, root in roots.items():
+            if root.kind == "template":
+                sender.directory_globs.pop(directory, None)
+    else:
+        for directory, root in roots.items():
+            if root.kind == "jinja":
+                sender.watch_dir(directory, "**/*")
+            elif root.kind == "static":
+                for watch_directory, glob in static_watch_globs(directory):
+                    sender.watch_dir(watch_directory, glob)
+            # Django watches its own template directories.
 
-    for storage in static_finder_storages():
-        sender.watch_dir(Path(storage.location), "**/*")
+    if getattr(settings, "BROWSER_RELOAD_TARGETED_TEMPLATE_CACHE", False):
+        # Replace Django's reset of all template loaders with evict_templates()
+        # in on_file_changed().
+        file_changed.disconnect(dispatch_uid="template_loaders_file_changed")
 
 
 @receiver(file_changed, dispatch_uid="browser_reload")
 def on_file_changed(*, file_path: Path, **kwargs: Any) -> bool | None:
     # Returning True tells Django *not* to reload
+    stats.record("file_changed", file_path=file_path)
+    root = classify_path(file_path)
+    if root is None:
+        stats.record("file_skipped", file_path=file_path, reason="unwatched")
+        return None
 
-    file_parents = file_path.parents
-
-    # Django Templates
-    for template_dir in django_template_directories():
-        if template_dir in file_parents:
-            trigger_reload_soon()
-            return True
+    if root.kind == "static" and not is_static_included(file_path, root.path):
+        stats.record("file_skipped", file_path=file_path, reason="ignored")
+        return True
 
-    # Jinja Templates
-    for template_dir in jinja_template_directories():
-        if template_dir in file_parents:
-            trigger_reload_soon()
-            return True
+    if getattr(
+        settings, "BROWSER_RELOAD_CONTENT_HASH", False
+    ) and not file_fingerprints.changed(file_path):
+        stats.record("file_skipped", file_path=file_path, reason="unchanged")
+        return True
 
-    # Static assets
-    for storage in static_finder_storages():
-        if Path(storage.location) in file_parents:
-            trigger_reload_soon()
-            return True
+    if root.kind in ("template", "jinja") and getattr(
+        settings, "BROWSER_RELOAD_TARGETED_TEMPLATE_CACHE", False
+    ):
+        evict_templates(file_path)
 
-    return None
+    trigger_reload_soon(Change(file_path, root))
+    return True
 
 
 def message(type_: str, **kwargs: Any) -> bytes:
@@ -137,8 +993,48 @@ def message(type_: str, **kwargs: Any) -> bytes:
     return f"data: {jsonified}\n\n".encode()
 
 
+@lru_cache(maxsize=8)
+def cached_message(type_: str, **kwargs: str | None) -> bytes:
+    """
+    Encode a message that is sent repeatedly with the same content, such as
+    pings, only once.
+    """
+    return message(type_, **kwargs)
+
+
+def full_reload_message() -> bytes:
+    """
+    Return the reload message for when the changes are unknown, such as for
+    subscribers that missed messages. Null changes make every tab reload
+    fully, even with scoped or soft reloads.
+    """
+    return cached_message("reload", changes=None)
+
+
+@lru_cache(maxsize=8)
+def retry_field(delay: float) -> bytes:
+    """
+    Encode a 'retry' field, which sets how long the browser waits before
+    reconnecting a dropped event stream, in milliseconds.
+    """
+    return f"retry: {round(delay * 1000)}\n".encode()
+
+
+def message_data(data: bytes) -> Any:
+    """
+    Decode the data of an event stream message from message().
+    """
+    return json.loads(data.removeprefix(b"data: "))
+
+
 PING_DELAY = 1.0  # seconds
 
+RECONNECT_DELAY = 0.3  # seconds
+
+LONG_POLL_TIMEOUT = 10.0  # seconds
+
+LONG_POLL_RESYNC_DELAY = 1.0  # seconds
+
 
 def events(request: HttpRequest) -> HttpResponseBase:
     if not settings.DEBUG:
@@ -149,27 +1045,67 @@ def events(request: HttpRequest) -> HttpResponseBase:
 
     event_stream: Callable[[], AsyncGenerator[bytes]] | Callable[[], Generator[bytes]]
 
+    # Start relaying messages from other processes, if configured.
+    get_channel()
+
+    # Subscribe immediately, so no message is missed before streaming starts.
+    subscriber = reload_hub.subscribe()
+
+    if not isinstance(request, ASGIRequest) and getattr(
+        settings, "BROWSER_RELOAD_LONG_POLL", False
+    ):
+        # Tell the worker to long-poll instead, to avoid holding a server
+        # thread for as long as the page stays open.
+        reload_hub.unsubscribe(subscriber)
+        response: HttpResponseBase = HttpResponse(
+            message(
+                "transport",
+                url=reverse("django_browser_reload:poll"),
+                cursor=reload_hub.cursor(subscriber.generation),
+            ),
+            content_type="text/event-stream",
+        )
+        response["content-encoding"] = ""
+        return response
+
+    ping_interval = getattr(settings, "BROWSER_RELOAD_PING_INTERVAL", PING_DELAY)
+    retry = retry_field(
+        getattr(settings, "BROWSER_RELOAD_RECONNECT_DELAY", RECONNECT_DELAY)
+    )
+
+    def ping() -> bytes:
+        return cached_message("ping", versionId=current_version_id())
+
     if isinstance(request, ASGIRequest):
 
         async def event_stream() -> AsyncGenerator[bytes]:
-            while True:
-                await asyncio.sleep(PING_DELAY)
-                yield message("ping", versionId=version_id)
-
-                if should_reload_event.is_set():
-                    should_reload_event.clear()
-                    yield message("reload")
+            subscriber.bind_loop()
+            try:
+                yield retry + ping()
+                while True:
+                    messages = await subscriber.wait_async(timeout=ping_interval)
+                    if messages:
+                        stats.record("message_delivered", count=len(messages))
+                        yield b"".join(messages)
+                    else:
+                        # Keep the connection alive
+                        yield ping()
+            finally:
+                reload_hub.unsubscribe(subscriber)
 
     else:
 
         def event_stream() -> Generator[bytes]:
-            while True:
-                yield message("ping", versionId=version_id)
-
-                should_reload = should_reload_event.wait(timeout=PING_DELAY)
-                if should_reload:
-                    should_reload_event.clear()
-                    yield message("reload")
+            try:
+                yield retry + ping()
+                while True:
+                    messages = subscriber.wait(timeout=ping_interval)
+                    if messages:
+                        stats.record("message_delivered", count=len(messages))
+                        yield b"".join(messages)
+                    yield ping()
+            finally:
+                reload_hub.unsubscribe(subscriber)
 
     response = StreamingHttpResponse(
         event_stream(),
@@ -180,6 +1116,77 @@ def events(request: HttpRequest) -> HttpResponseBase:
     return response
 
 
+def poll(request: HttpRequest) -> HttpResponseBase:
+    """
+    Long-polling alternative to the events stream. Waits until there are
+    messages after the given cursor, or the timeout passes, and returns them
+    with a cursor for the next request.
+    """
+    if not settings.DEBUG:
+        raise Http404()
+
+    channel = get_channel()
+    if channel is not None:
+        # Catch up with other processes, as the cursor may come from one.
+        channel.poll()
+
+    if isinstance(request, ASGIRequest):
+        # Sync views share a thread on ASGI, so don't hold it.
+        timeout = 0.0
+    else:
+        timeout = getattr(
+            settings, "BROWSER_RELOAD_LONG_POLL_TIMEOUT", LONG_POLL_TIMEOUT
+        )
+
+    subscriber = reload_hub.resume(request.GET.get("cursor", ""))
+    if subscriber is None:
+        # Start afresh, such as after a server restart. A changed version ID
+        # tells the worker to reload. Hold briefly, so a worker given
+        # unknown cursors repeatedly doesn't poll in a tight loop.
+        subscriber = Subscriber(reload_hub)
+        timeout = min(timeout, LONG_POLL_RESYNC_DELAY)
+    messages = subscriber.wait(timeout=timeout)
+    if messages:
+        stats.record("message_delivered", count=len(messages))
+
+    response = JsonResponse(
+        {
+            "versionId": current_version_id(),
+            "cursor": reload_hub.cursor(subscriber.generation),
+            "messages": [message_data(data) for data in messages],
+        }
+    )
+    response["cache-control"] = "no-store"
+    return response
+
+
+def stats_view(request: HttpRequest) -> HttpResponseBase:
+    """
+    Return counters for the reload pipeline, for debugging slow reloads.
+    """
+    if not settings.DEBUG:
+        raise Http404()
+
+    return JsonResponse(
+        {
+            "versionId": current_version_id(),
+            "counters": stats.snapshot(),
+            "subscribers": len(reload_hub.subscribers),
+            "generation": reload_hub.generation,
+            "debouncer": {
+                "scheduled": reload_debouncer.scheduled,
+                "coalesced": reload_debouncer.coalesced,
+                "fired": reload_debouncer.fired,
+            },
+            "fingerprints": {
+                "hits": file_fingerprints.hits,
+                "misses": file_fingerprints.misses,
+                "entries": len(file_fingerprints.entries),
+            },
+        }
+    )
+
+
 if django.VERSION >= (5, 1):
     # isort: off
     from django.contrib.auth.decorators import login_not_required
@@ -187,3 +1194,5 @@ if django.VERSION >= (5, 1):
     # isort: on
 
     events = login_not_required(events)
+    poll = login_not_required(poll)
+    stats_view = login_not_required(stats_view)
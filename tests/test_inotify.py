@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import os
+import queue
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from django_browser_reload import inotify
+from django_browser_reload.inotify import InotifyWatcher
+
+
+@skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class InotifyWatcherTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name).resolve()
+        self.changes: queue.Queue[Path] = queue.Queue()
+        self.watcher = InotifyWatcher(self.changes.put)
+        self.addCleanup(self.watcher.stop)
+
+    def start(self, **kwargs: Any) -> None:
+        self.watcher.watch(self.root, **kwargs)
+        self.watcher.start()
+
+    def changed(self) -> Path:
+        return self.changes.get(timeout=5)
+
+    def test_write(self):
+        self.start()
+
+        (self.root / "a.css").write_text("a {}")
+
+        assert self.changed() == self.root / "a.css"
+
+    def test_write_subdirectory(self):
+        (self.root / "css").mkdir()
+        self.start()
+
+        (self.root / "css" / "a.css").write_text("a {}")
+
+        assert self.changed() == self.root / "css" / "a.css"
+
+    def test_move_in(self):
+        self.start()
+        temp_path = self.root.parent / f"{self.root.name}.tmp"
+        temp_path.write_text("a {}")
+
+        os.replace(temp_path, self.root / "a.css")
+
+        assert self.changed() == self.root / "a.css"
+
+    def test_new_directory(self):
+        self.start()
+
+        (self.root / "css").mkdir()
+        # Wait for the new directory to be watched.
+        (self.root / "marker").write_text("")
+        assert self.changed() == self.root / "marker"
+        (self.root / "css" / "a.css").write_text("a {}")
+
+        assert self.changed() == self.root / "css" / "a.css"
+
+    def test_excluded_directory(self):
+        (self.root / "node_modules").mkdir()
+        self.start(exclude=lambda name: name == "node_modules")
+
+        (self.root / "node_modules" / "a.js").write_text("")
+        (self.root / "a.js").write_text("")
+
+        assert self.changed() == self.root / "a.js"
+        assert self.changes.empty()
+
+    def test_removed_directory(self):
+        (self.root / "css").mkdir()
+        self.start()
+
+        (self.root / "css").rmdir()
+        (self.root / "a.css").write_text("a {}")
+
+        assert self.changed() == self.root / "a.css"
+        assert list(self.watcher.watches.values()) == [(self.root, None)]
+
+    def test_callback_error(self):
+        def callback(path: Path) -> None:
+            if path.name == "bad.css":
+                raise ValueError("Boom")
+            self.changes.put(path)
+
+        self.watcher.callback = callback
+        self.start()
+
+        with self.assertLogs("django_browser_reload", "ERROR") as logs:
+            (self.root / "bad.css").write_text("")
+            (self.root / "a.css").write_text("a {}")
+
+            assert self.changed() == self.root / "a.css"
+
+        assert logs.records[0].getMessage() == (
+            f"Error handling change to {self.root / 'bad.css'}"
+        )
+
+    def test_watch_missing(self):
+        self.watcher.watch(self.root / "missing")
+
+        assert self.watcher.watches == {}
+
+
+class LibcTests(SimpleTestCase):
+    def setUp(self):
+        inotify.libc.cache_clear()
+        self.addCleanup(inotify.libc.cache_clear)
+
+    def test_not_linux(self):
+        with (
+            mock.patch.object(sys, "platform", "darwin"),
+            self.assertRaises(OSError),
+        ):
+            InotifyWatcher(print)
@@ -3,8 +3,14 @@ from __future__ import annotations
 import secrets
 
 from django.test import SimpleTestCase, override_settings
+from django.urls import set_script_prefix
+from django.utils.safestring import SafeString
 
-from django_browser_reload.jinja import django_browser_reload_script
+from django_browser_reload.jinja import (
+    django_browser_reload_script,
+    preload_link,
+    script_opening,
+)
 
 
 class DjangoBrowserReloadScriptTests(SimpleTestCase):
@@ -37,3 +43,79 @@ class DjangoBrowserReloadScriptTests(SimpleTestCase):
             + f' data-events-path="/__reload__/events/" defer nonce="{nonce}">'
             + "</script>"
         )
+
+    def test_debug_nonce_escaped(self):
+        with override_settings(DEBUG=True):
+            result = django_browser_reload_script(nonce='"><b>')
+
+        assert result.endswith(' defer nonce="&quot;&gt;&lt;b&gt;"></script>')
+
+    def test_debug_safe(self):
+        with override_settings(DEBUG=True):
+            result = django_browser_reload_script()
+
+        assert isinstance(result, SafeString)
+
+    def test_debug_cached(self):
+        script_opening.cache_clear()
+        with override_settings(DEBUG=True):
+            django_browser_reload_script()
+            django_browser_reload_script(nonce="abc")
+            info = script_opening.cache_info()
+
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_debug_static_url_changed(self):
+        with override_settings(DEBUG=True):
+            django_browser_reload_script()
+            with override_settings(STATIC_URL="/assets/"):
+                result = django_browser_reload_script()
+
+        assert result.startswith(
+            '<script src="/assets/django-browser-reload/reload-listener.js"'
+        )
+
+    def test_debug_script_prefix(self):
+        with override_settings(DEBUG=True):
+            django_browser_reload_script()
+            set_script_prefix("/prefix/")
+            try:
+                result = django_browser_reload_script()
+            finally:
+                set_script_prefix("/")
+
+        assert ' data-events-path="/prefix/__reload__/events/"' in result
+
+    def test_debug_soft_reloads(self):
+        with override_settings(DEBUG=True, BROWSER_RELOAD_SOFT_RELOADS=True):
+            result = django_browser_reload_script()
+
+        assert result.endswith(" defer data-soft-reload></script>")
+
+    def test_debug_templates(self):
+        with override_settings(DEBUG=True):
+            result = django_browser_reload_script(
+                nonce="abc", templates={"/b.html", "/a.html"}
+            )
+
+        assert result.endswith(
+            ' defer data-templates="[&quot;/a.html&quot;, &quot;/b.html&quot;]"'
+            + ' nonce="abc"></script>'
+        )
+
+
+class PreloadLinkTests(SimpleTestCase):
+    def test_success(self):
+        result = preload_link("/", None)
+
+        assert result == (
+            "</static/django-browser-reload/reload-listener.js>; rel=preload; as=script"
+        )
+
+    def test_static_url_changed(self):
+        preload_link("/", None)
+        with override_settings(STATIC_URL="/assets/"):
+            result = preload_link("/", None)
+
+        assert result.startswith("</assets/")
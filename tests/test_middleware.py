@@ -1,13 +1,33 @@
 from __future__ import annotations
 
+import gzip
+import importlib
+import json
 import secrets
+import zlib
+from collections.abc import AsyncGenerator
+from typing import Any
+from unittest import mock
 
+from django.conf import settings
 from django.core.exceptions import MiddlewareNotUsed
 from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from django.http.response import HttpResponseBase
+from django.shortcuts import render
+from django.template import Context, Template
 from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.html import escape
 
-from django_browser_reload.middleware import BrowserReloadMiddleware
+from django_browser_reload import stats
+from django_browser_reload.middleware import (
+    SEARCH_WINDOW,
+    BrowserReloadMiddleware,
+    StreamInjector,
+    content_codecs,
+    find_last,
+    insert_before_pattern,
+    rendered_templates,
+)
 
 
 @override_settings(DEBUG=True)
@@ -36,17 +56,151 @@ class BrowserReloadMiddlewareTests(SimpleTestCase):
         assert response.content == b"<html><body></body></html>"
 
     def test_streaming_response(self):
-        # content that the middleware could inject in if it supported streaming
-        # responses
         content_iter = iter(["<html><body>", "</body></html>"])
         self.response = StreamingHttpResponse(content_iter)
 
         response = self.middleware(self.request)
 
+        assert isinstance(response, StreamingHttpResponse)
+        content = b"".join(response)
+        assert content == (
+            b"<html><body>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+            + b"</body></html>"
+        )
+
+    def test_streaming_response_split_tag(self):
+        content_iter = iter(["<html><body></bo", "dy></html>"])
+        self.response = StreamingHttpResponse(content_iter)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        content = b"".join(response)
+        assert content == (
+            b"<html><body>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+            + b"</body></html>"
+        )
+
+    def test_streaming_response_two_matches(self):
+        content_iter = iter(["<html><body></body>", "<body></BODY>", "</html>"])
+        self.response = StreamingHttpResponse(content_iter)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        content = b"".join(response)
+        assert content == (
+            b"<html><body></body><body>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+            + b"</BODY></html>"
+        )
+
+    def test_streaming_response_no_match(self):
+        content_iter = iter(["<html><body>", "Woops"])
+        self.response = StreamingHttpResponse(content_iter)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        assert list(response) == [b"<html>", b"<body", b">Woops"]
+
+    def test_streaming_response_chunks_not_buffered(self):
+        content_iter = iter(["<html><body>" + "a" * 100, "</body></html>"])
+        self.response = StreamingHttpResponse(content_iter)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        first = next(iter(response))
+        assert first == b"<html><body>" + b"a" * 94
+
+    def test_streaming_response_max_held(self):
+        trailer = "a" * StreamInjector.MAX_HELD
+        content_iter = iter(["<html><body></body>", trailer, "</html>"])
+        self.response = StreamingHttpResponse(content_iter)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        content = b"".join(response)
+        assert content == (
+            b"<html><body>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+            + b"</body>"
+            + trailer.encode()
+            + b"</html>"
+        )
+
+    def test_streaming_response_utf16(self):
+        content_iter = iter(["<html><body>", "</body></html>"])
+        self.response = StreamingHttpResponse(
+            (chunk.encode("utf-16-le") for chunk in content_iter),
+            content_type="text/html; charset=utf-16-le",
+        )
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        content = b"".join(response).decode("utf-16-le")
+        assert content == (
+            "<html><body>"
+            + '<script src="/static/django-browser-reload/reload-listener.js"'
+            + ' data-worker-script-path="/static/django-browser-reload/'
+            + 'reload-worker.js"'
+            + ' data-events-path="/__reload__/events/" defer></script>'
+            + "</body></html>"
+        )
+
+    def test_streaming_response_content_length(self):
+        content_iter = iter(["<html><body>", "</body></html>"])
+        self.response = StreamingHttpResponse(content_iter)
+        self.response["Content-Length"] = "26"
+
+        response = self.middleware(self.request)
+
         assert isinstance(response, StreamingHttpResponse)
         content = b"".join(response)
         assert content == b"<html><body></body></html>"
 
+    async def test_async_streaming_response(self):
+        async def content_iter() -> AsyncGenerator[str]:
+            yield "<html><body>"
+            yield "</body></html>"
+
+        async def get_response(request: HttpRequest) -> HttpResponseBase:
+            return StreamingHttpResponse(content_iter())
+
+        middleware = BrowserReloadMiddleware(get_response)
+
+        result = middleware(self.request)
+        assert not isinstance(result, HttpResponseBase)
+        response = await result
+
+        assert isinstance(response, StreamingHttpResponse)
+        content = b"".join([chunk async for chunk in response])
+        assert content == (
+            b"<html><body>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+            + b"</body></html>"
+        )
+
     def test_encoded_response(self):
         self.response["Content-Encoding"] = "zabble"
 
@@ -55,6 +209,150 @@ class BrowserReloadMiddlewareTests(SimpleTestCase):
         assert isinstance(response, HttpResponse)
         assert response.content == b"<html><body></body></html>"
 
+    def test_encoded_response_counted(self):
+        stats.reset()
+        self.addCleanup(stats.reset)
+        self.response["Content-Encoding"] = "zabble"
+
+        self.middleware(self.request)
+
+        assert stats.snapshot() == {"response_skipped": 1}
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_unknown(self):
+        self.response["Content-Encoding"] = "zabble"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == b"<html><body></body></html>"
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_gzip(self):
+        self.response = HttpResponse(gzip.compress(b"<html><body></body></html>"))
+        self.response["Content-Encoding"] = "gzip"
+        self.response["Content-Length"] = len(self.response.content)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response["Content-Length"] == str(len(response.content))
+        content = gzip.decompress(response.content)
+        assert content.startswith(b"<html><body><script ")
+        assert content.endswith(b"></script></body></html>")
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_deflate(self):
+        self.response = HttpResponse(zlib.compress(b"<html><body></body></html>"))
+        self.response["Content-Encoding"] = "deflate"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        content = zlib.decompress(response.content)
+        assert content.endswith(b"></script></body></html>")
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_raw_deflate(self):
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw = compressor.compress(b"<html><body></body></html>") + compressor.flush()
+        self.response = HttpResponse(raw)
+        self.response["Content-Encoding"] = "deflate"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        content = zlib.decompress(response.content)
+        assert content.endswith(b"></script></body></html>")
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_invalid(self):
+        self.response = HttpResponse(b"not gzip")
+        self.response["Content-Encoding"] = "gzip"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == b"not gzip"
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_no_match(self):
+        compressed = gzip.compress(b"<html><body>Woops")
+        self.response = HttpResponse(compressed)
+        self.response["Content-Encoding"] = "gzip"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == compressed
+
+    @override_settings(BROWSER_RELOAD_INJECT_COMPRESSED=True)
+    def test_encoded_response_streaming(self):
+        compressed = gzip.compress(b"<html><body></body></html>")
+        self.response = StreamingHttpResponse(iter([compressed]))
+        self.response["Content-Encoding"] = "gzip"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, StreamingHttpResponse)
+        assert b"".join(response) == compressed
+
+    @override_settings(BROWSER_RELOAD_INJECTION_MODE="append")
+    def test_append(self):
+        self.response["Content-Length"] = len(b"<html><body></body></html>")
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == (
+            b"<html><body></body></html>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+        )
+        assert response["Content-Length"] == str(len(response.content))
+        assert response["Link"] == (
+            "</static/django-browser-reload/reload-listener.js>;"
+            + " rel=preload; as=script"
+        )
+
+    @override_settings(BROWSER_RELOAD_INJECTION_MODE="append")
+    def test_append_existing_link(self):
+        self.response["Link"] = "</style.css>; rel=preload; as=style"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response["Link"] == (
+            "</style.css>; rel=preload; as=style, "
+            + "</static/django-browser-reload/reload-listener.js>;"
+            + " rel=preload; as=script"
+        )
+
+    @override_settings(BROWSER_RELOAD_INJECTION_MODE="append")
+    def test_append_no_match(self):
+        self.response = HttpResponse("<p>Fragment</p>")
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == b"<p>Fragment</p>"
+        assert "Link" not in response
+
+    @override_settings(
+        BROWSER_RELOAD_INJECTION_MODE="append", BROWSER_RELOAD_INJECT_COMPRESSED=True
+    )
+    def test_append_compressed_inserts(self):
+        self.response = HttpResponse(gzip.compress(b"<html><body></body></html>"))
+        self.response["Content-Encoding"] = "gzip"
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        content = gzip.decompress(response.content)
+        assert content.endswith(b"></script></body></html>")
+
     def test_text_response(self):
         self.response["Content-Type"] = "text/plain"
 
@@ -71,6 +369,16 @@ class BrowserReloadMiddlewareTests(SimpleTestCase):
         assert isinstance(response, HttpResponse)
         assert response.content == b"<html><body>Woops"
 
+    def test_success_counted(self):
+        stats.reset()
+        self.addCleanup(stats.reset)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        added = len(response.content) - len(b"<html><body></body></html>")
+        assert stats.snapshot() == {"response_injected": 1, "injected_bytes": added}
+
     def test_success(self):
         self.response = HttpResponse("<html><body></body></html>")
         self.response["Content-Length"] = len(self.response.content)
@@ -137,6 +445,120 @@ class BrowserReloadMiddlewareTests(SimpleTestCase):
             + b"</body></html>"
         )
 
+    def test_large_match_before_final_window(self):
+        body = "a" * (2 * SEARCH_WINDOW)
+        self.response = HttpResponse("<html><body></body>" + body + "</html>")
+        self.response["Content-Length"] = len(self.response.content)
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == (
+            b"<html><body>"
+            + b'<script src="/static/django-browser-reload/reload-listener.js"'
+            + b' data-worker-script-path="/static/django-browser-reload/'
+            + b'reload-worker.js"'
+            + b' data-events-path="/__reload__/events/" defer></script>'
+            + b"</body>"
+            + body.encode()
+            + b"</html>"
+        )
+        assert response["Content-Length"] == str(len(response.content))
+
+    @override_settings(BROWSER_RELOAD_TAIL_SEARCH_THRESHOLD=100)
+    def test_large_tail_only(self):
+        body = "a" * SEARCH_WINDOW
+        self.response = HttpResponse("<html><body></body>" + body + "</html>")
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content == (b"<html><body></body>" + body.encode() + b"</html>")
+
+    @override_settings(BROWSER_RELOAD_TAIL_SEARCH_THRESHOLD=100)
+    def test_large_tail_only_match(self):
+        body = "a" * SEARCH_WINDOW
+        self.response = HttpResponse("<html><body>" + body + "</body></html>")
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content.endswith(b"defer></script></body></html>")
+
+    def test_utf16(self):
+        self.response = HttpResponse(
+            "<html><body></body></html>".encode("utf-16"),
+            content_type="text/html; charset=utf-16",
+        )
+
+        response = self.middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert response.content.decode("utf-16") == (
+            "<html><body>"
+            + '<script src="/static/django-browser-reload/reload-listener.js"'
+            + ' data-worker-script-path="/static/django-browser-reload/'
+            + 'reload-worker.js"'
+            + ' data-events-path="/__reload__/events/" defer></script>'
+            + "</body></html>"
+        )
+
+    @override_settings(BROWSER_RELOAD_SCOPED_RELOADS=True)
+    def test_scoped_reloads(self):
+        def get_response(request: HttpRequest) -> HttpResponseBase:
+            return render(request, "page.html")
+
+        middleware = BrowserReloadMiddleware(get_response)
+
+        response = middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        templates = [
+            str(settings.BASE_DIR / "templates" / "django" / name)
+            for name in ["base.html", "page.html", "part.html"]
+        ]
+        assert escape(json.dumps(templates)).encode() in response.content
+        assert rendered_templates.get() is None
+
+    @override_settings(BROWSER_RELOAD_SCOPED_RELOADS=True)
+    async def test_async_scoped_reloads(self):
+        async def get_response(request: HttpRequest) -> HttpResponse:
+            return render(request, "page.html")
+
+        middleware = BrowserReloadMiddleware(get_response)
+
+        result = middleware(self.request)
+        assert not isinstance(result, HttpResponseBase)
+        response = await result
+
+        assert isinstance(response, HttpResponse)
+        assert b"data-templates=" in response.content
+        assert b"part.html" in response.content
+
+    @override_settings(BROWSER_RELOAD_SCOPED_RELOADS=True)
+    def test_scoped_reloads_string_template(self):
+        def get_response(request: HttpRequest) -> HttpResponseBase:
+            template = Template("<html><body></body></html>")
+            return HttpResponse(template.render(Context()))
+
+        middleware = BrowserReloadMiddleware(get_response)
+
+        response = middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert b' data-templates="[]"' in response.content
+
+    def test_not_scoped_reloads(self):
+        def get_response(request: HttpRequest) -> HttpResponseBase:
+            return render(request, "page.html")
+
+        middleware = BrowserReloadMiddleware(get_response)
+
+        response = middleware(self.request)
+
+        assert isinstance(response, HttpResponse)
+        assert b"data-templates" not in response.content
+
     def test_csp_nonce(self):
         nonce = secrets.token_urlsafe(16)
         self.request._csp_nonce = nonce  # type: ignore[attr-defined]
@@ -156,3 +578,80 @@ class BrowserReloadMiddlewareTests(SimpleTestCase):
             + b'"></script>'
             + b"</body></html>"
         )
+
+
+class ContentCodecsTests(SimpleTestCase):
+    def setUp(self):
+        content_codecs.cache_clear()
+        self.addCleanup(content_codecs.cache_clear)
+
+    def import_only(self, **modules: object) -> Any:
+        def import_module(name: str) -> object:
+            try:
+                return modules[name]
+            except KeyError:
+                raise ImportError(name) from None
+
+        return mock.patch.object(importlib, "import_module", import_module)
+
+    def test_builtin(self):
+        with self.import_only():
+            codecs = content_codecs()
+
+        assert sorted(codecs) == ["deflate", "gzip"]
+        codec = codecs["gzip"]
+        assert codec.decompress(codec.compress(b"abc", 1)) == b"abc"
+
+    def test_brotli(self):
+        brotli = mock.Mock(error=ValueError)
+
+        with self.import_only(brotli=brotli):
+            codec = content_codecs()["br"]
+
+        codec.compress(b"abc", 1)
+        brotli.compress.assert_called_once_with(b"abc", quality=1)
+        assert codec.errors == (ValueError,)
+
+    def test_zstd(self):
+        zstd = mock.Mock(ZstdError=ValueError)
+
+        with self.import_only(**{"compression.zstd": zstd}):
+            codec = content_codecs()["zstd"]
+
+        codec.compress(b"abc", 1)
+        zstd.compress.assert_called_once_with(b"abc", 1)
+
+    def test_zstandard(self):
+        zstandard = mock.Mock(ZstdError=ValueError)
+
+        with self.import_only(zstandard=zstandard):
+            codec = content_codecs()["zstd"]
+
+        codec.compress(b"abc", 1)
+        zstandard.compress.assert_called_once_with(b"abc", 1)
+
+
+class FindLastTests(SimpleTestCase):
+    pattern = insert_before_pattern("utf-8")
+
+    def test_empty(self):
+        assert find_last(b"", self.pattern) is None
+
+    def test_no_match(self):
+        assert find_last(b"a" * (3 * SEARCH_WINDOW), self.pattern) is None
+
+    def test_case_insensitive(self):
+        assert find_last(b"<body></BoDy>", self.pattern) == 6
+
+    def test_last(self):
+        assert find_last(b"</body></body>", self.pattern) == 7
+
+    def test_across_window_boundary(self):
+        content = b"</body>" + b"a" * (SEARCH_WINDOW - 3)
+
+        assert find_last(content, self.pattern) == 0
+
+    def test_tail_only(self):
+        content = b"</body>" + b"a" * SEARCH_WINDOW
+
+        assert find_last(content, self.pattern, tail_only=True) is None
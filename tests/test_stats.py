@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.test import SimpleTestCase
+
+from django_browser_reload import stats
+
+
+class RecordTests(SimpleTestCase):
+    def setUp(self):
+        stats.reset()
+        self.addCleanup(stats.reset)
+        self.calls: list[dict[str, Any]] = []
+
+        def receiver(**kwargs: Any) -> None:
+            self.calls.append(kwargs)
+
+        stats.reload_stage.connect(receiver, weak=False, dispatch_uid="test")
+        self.addCleanup(stats.reload_stage.disconnect, dispatch_uid="test")
+
+    def test_counts(self):
+        stats.record("file_changed")
+        stats.record("file_changed")
+
+        assert stats.snapshot() == {"file_changed": 2}
+
+    def test_sends_signal(self):
+        stats.record("response_skipped", reason="encoded")
+
+        assert len(self.calls) == 1
+        call = self.calls[0]
+        assert call["stage"] == "response_skipped"
+        assert call["reason"] == "encoded"
+        assert isinstance(call["timestamp"], float)
+
+    def test_receiver_error(self):
+        def receiver(**kwargs: Any) -> None:
+            raise ValueError("Boom")
+
+        stats.reload_stage.connect(receiver, weak=False, dispatch_uid="error")
+        self.addCleanup(stats.reload_stage.disconnect, dispatch_uid="error")
+
+        with self.assertLogs("django.dispatch", "ERROR"):
+            stats.record("file_changed")
+
+        assert stats.snapshot() == {"file_changed": 1}
+
+    def test_increment(self):
+        stats.increment("injected_bytes", 10)
+        stats.increment("injected_bytes", 5)
+
+        assert stats.snapshot() == {"injected_bytes": 15}
+        assert self.calls == []
+
+    def test_reset(self):
+        stats.record("file_changed")
+
+        stats.reset()
+
+        assert stats.snapshot() == {}
@@ -1,18 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
 import time
 from http import HTTPStatus
 from pathlib import Path
-from unittest import mock
+from typing import Any
+from unittest import mock, skipUnless
 
 from django.conf import settings
 from django.http import StreamingHttpResponse
 from django.middleware.gzip import GZipMiddleware
+from django.template import Context, TemplateDoesNotExist, engines
+from django.template.autoreload import (  # type: ignore [import-untyped]
+    template_changed,
+)
 from django.test import RequestFactory, SimpleTestCase, override_settings
-from django.utils.autoreload import BaseReloader
+from django.utils.autoreload import BaseReloader, file_changed
 
 import django_browser_reload
-from django_browser_reload import views
+from django_browser_reload import stats, views
 
 
 class OnAutoreloadStartedTests(SimpleTestCase):
@@ -33,43 +45,1058 @@ class OnAutoreloadStartedTests(SimpleTestCase):
             (Path(django_browser_reload.__file__).parent / "static", "**/*"),
         ]
 
+    @override_settings(BROWSER_RELOAD_TARGETED_TEMPLATE_CACHE=True)
+    def test_targeted_template_cache(self):
+        self.addCleanup(
+            file_changed.connect,
+            template_changed,
+            dispatch_uid="template_loaders_file_changed",
+        )
+
+        views.on_autoreload_started(sender=BaseReloader())
+
+        assert not any(
+            lookup_key[0] == "template_loaders_file_changed"
+            for lookup_key, *_ in file_changed.receivers
+        )
+
+    @override_settings(BROWSER_RELOAD_INOTIFY=True)
+    def test_inotify(self):
+        calls: list[tuple[Path, str]] = []
+
+        class FakeReloader(BaseReloader):
+            def watch_dir(self, directory, glob):
+                calls.append((directory, glob))
+
+        reloader = FakeReloader()
+        template_dir = settings.BASE_DIR / "templates" / "django"
+        reloader.directory_globs[template_dir].add("**/*")
+        self.addCleanup(views.stop_inotify_watcher)
+
+        with mock.patch.object(views, "InotifyWatcher") as watcher_class:
+            views.on_autoreload_started(sender=reloader)
+
+        assert calls == []
+        assert template_dir not in reloader.directory_globs
+        watcher = watcher_class.return_value
+        assert [call.args[0] for call in watcher.watch.call_args_list] == [
+            template_dir,
+            settings.BASE_DIR / "templates" / "jinja",
+            settings.BASE_DIR / "static",
+            Path(django_browser_reload.__file__).parent / "static",
+        ]
+        watcher.start.assert_called_once_with()
+        assert views.inotify_watcher is watcher
+
+    @override_settings(BROWSER_RELOAD_INOTIFY=True)
+    def test_inotify_unavailable(self):
+        calls: list[tuple[Path, str]] = []
+
+        class FakeReloader(BaseReloader):
+            def watch_dir(self, directory, glob):
+                calls.append((directory, glob))
+
+        with mock.patch.object(views, "InotifyWatcher", side_effect=OSError):
+            views.on_autoreload_started(sender=FakeReloader())
+
+        assert calls == [
+            (settings.BASE_DIR / "templates" / "jinja", "**/*"),
+            (settings.BASE_DIR / "static", "**/*"),
+            (Path(django_browser_reload.__file__).parent / "static", "**/*"),
+        ]
+        assert views.inotify_watcher is None
+
+
+class StartInotifyWatcherTests(SimpleTestCase):
+    @skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_sends_file_changed(self):
+        self.addCleanup(views.stop_inotify_watcher)
+        changed: queue.Queue[Path] = queue.Queue()
+
+        def receiver(*, file_path: Path, **kwargs: Any) -> None:
+            changed.put(file_path)
+
+        file_changed.connect(receiver, dispatch_uid="test")
+        self.addCleanup(file_changed.disconnect, dispatch_uid="test")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = Path(temp_dir).resolve()
+            root = views.WatchedRoot(directory, "static")
+            with mock.patch.object(views, "trigger_reload_soon"):
+                assert views.start_inotify_watcher({directory: root})
+                (directory / "a.css").write_text("a {}")
+
+                assert changed.get(timeout=5) == directory / "a.css"
+
+    def test_stop(self):
+        with mock.patch.object(views, "InotifyWatcher") as watcher_class:
+            views.start_inotify_watcher({})
+        watcher = watcher_class.return_value
+
+        views.stop_inotify_watcher()
+
+        watcher.stop.assert_called_once_with()
+        assert views.inotify_watcher is None
+
+    def test_watch_fails(self):
+        with mock.patch.object(views, "InotifyWatcher") as watcher_class:
+            watcher = watcher_class.return_value
+            watcher.watch.side_effect = OSError
+
+            result = views.start_inotify_watcher(
+                {Path("/"): views.WatchedRoot(Path("/"), "static")}
+            )
+
+        assert result is False
+        watcher.close.assert_called_once_with()
+        watcher.start.assert_not_called()
+
+
+class EvictTemplatesTests(SimpleTestCase):
+    template_dir = settings.BASE_DIR / "templates" / "django"
+
+    def setUp(self):
+        self.engine = engines["django"].engine  # type: ignore [attr-defined]
+        self.cache = self.engine.template_loaders[0].get_template_cache
+        self.cache.clear()
+
+    def test_django(self):
+        self.engine.get_template("page.html").render(Context())
+        with self.assertRaises(TemplateDoesNotExist):
+            self.engine.get_template("new.html")
+
+        views.evict_templates(self.template_dir / "part.html")
+
+        assert sorted(self.cache) == ["base.html", "page.html"]
+
+    def test_django_extended(self):
+        self.engine.get_template("page.html").render(Context())
+
+        views.evict_templates(self.template_dir / "base.html")
+
+        assert sorted(self.cache) == ["page.html", "part.html"]
+
+    def test_jinja(self):
+        env = engines["jinja2"].env  # type: ignore [attr-defined]
+        env.get_template("example.html")
+
+        views.evict_templates(
+            settings.BASE_DIR / "templates" / "jinja" / "example.html"
+        )
+
+        assert not any(t.name == "example.html" for t in env.cache.values())
+
+    @override_settings(BROWSER_RELOAD_TARGETED_TEMPLATE_CACHE=True)
+    def test_on_file_changed(self):
+        self.engine.get_template("page.html")
+        self.engine.get_template("part.html")
+
+        with mock.patch.object(views, "trigger_reload_soon"):
+            views.on_file_changed(file_path=self.template_dir / "part.html")
+
+        assert list(self.cache) == ["page.html"]
+
+
+class PrewarmTemplatesTests(SimpleTestCase):
+    django_root = views.WatchedRoot(
+        settings.BASE_DIR / "templates" / "django", "template"
+    )
+
+    def test_django(self):
+        cache = engines["django"].engine.template_loaders[0].get_template_cache  # type: ignore [attr-defined]
+        cache.clear()
+
+        errors = views.prewarm_templates(
+            [views.Change(self.django_root.path / "part.html", self.django_root)]
+        )
+
+        assert errors == {}
+        assert list(cache) == ["part.html"]
+
+    def test_jinja(self):
+        root = views.WatchedRoot(settings.BASE_DIR / "templates" / "jinja", "jinja")
+        env = engines["jinja2"].env  # type: ignore [attr-defined]
+        env.cache.clear()
+
+        errors = views.prewarm_templates(
+            [views.Change(root.path / "example.html", root)]
+        )
+
+        assert errors == {}
+        assert [t.name for t in env.cache.values()] == ["example.html"]
+
+    def test_missing_and_static(self):
+        static_root = views.WatchedRoot(settings.BASE_DIR / "static", "static")
+
+        errors = views.prewarm_templates(
+            [
+                views.Change(self.django_root.path / "missing.html", self.django_root),
+                views.Change(static_root.path / "example.js", static_root),
+            ]
+        )
+
+        assert errors == {}
+
+    def test_syntax_error(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = Path(temp_dir.name) / "broken.html"
+        path.write_text("{% if %}")
+        root = views.WatchedRoot(Path(temp_dir.name), "template")
+
+        with override_settings(
+            TEMPLATES=[
+                {
+                    "BACKEND": "django.template.backends.django.DjangoTemplates",
+                    "DIRS": [temp_dir.name],
+                }
+            ]
+        ):
+            errors = views.prewarm_templates([views.Change(path, root)])
+
+        assert list(errors) == [path]
+        assert "if" in errors[path]
+
+    @override_settings(BROWSER_RELOAD_PREWARM_TEMPLATES=True)
+    def test_send_reload(self):
+        subscriber = views.reload_hub.subscribe()
+        change = views.Change(self.django_root.path / "part.html", self.django_root)
+
+        with mock.patch.object(
+            views, "prewarm_templates", return_value={change.path: "Woops"}
+        ):
+            views.send_reload([change])
+
+        assert subscriber.poll() == [
+            views.message(
+                "reload",
+                changes=[
+                    {"kind": "template", "path": str(change.path), "error": "Woops"}
+                ],
+            )
+        ]
+
+
+class DebouncerTests(SimpleTestCase):
+    def setUp(self):
+        self.called = threading.Event()
+        self.calls: list[list[int]] = []
+
+        def callback(items: list[int]) -> None:
+            self.calls.append(items)
+            self.called.set()
+
+        self.debouncer = views.Debouncer(callback)
+
+    def test_single(self):
+        self.debouncer.schedule(1, delay=0.001, max_wait=1.0)
+
+        assert self.called.wait(timeout=10.0)
+        assert self.calls == [[1]]
+        assert self.debouncer.scheduled == 1
+        assert self.debouncer.coalesced == 0
+        assert self.debouncer.fired == 1
+
+    def test_coalesces(self):
+        for i in range(100):
+            self.debouncer.schedule(i % 3, delay=0.05, max_wait=10.0)
+
+        assert self.called.wait(timeout=10.0)
+        assert self.calls == [[0, 1, 2]]
+        assert self.debouncer.scheduled == 100
+        assert self.debouncer.coalesced == 99
+        assert self.debouncer.fired == 1
+
+    def test_max_wait(self):
+        start = time.monotonic()
+        while not self.called.is_set():
+            self.debouncer.schedule(1, delay=0.05, max_wait=0.1)
+            time.sleep(0.01)
+            assert time.monotonic() - start < 10.0
+
+        assert self.debouncer.fired == 1
+
+    def test_quiet_period(self):
+        start = time.monotonic()
+        while time.monotonic() - start < 0.2:
+            self.debouncer.schedule(1, delay=0.05, max_wait=None)
+            time.sleep(0.01)
+
+        assert not self.called.is_set()
+        assert self.called.wait(timeout=10.0)
+        assert self.calls == [[1]]
+
+    def test_single_thread(self):
+        self.debouncer.schedule(1, delay=0.001, max_wait=1.0)
+        thread = self.debouncer.thread
+        assert self.called.wait(timeout=10.0)
+        self.called.clear()
+
+        self.debouncer.schedule(2, delay=0.001, max_wait=1.0)
+
+        assert self.called.wait(timeout=10.0)
+        assert self.calls == [[1], [2]]
+        assert self.debouncer.thread is thread
+        assert self.debouncer.fired == 2
+
+    def test_callback_error(self):
+        def callback(items: list[int]) -> None:
+            if items == [1]:
+                raise OSError("Boom")
+            self.calls.append(items)
+            self.called.set()
+
+        debouncer = views.Debouncer(callback)
+
+        with self.assertLogs("django_browser_reload", "ERROR") as logs:
+            debouncer.schedule(1, delay=0.001, max_wait=1.0)
+            start = time.monotonic()
+            while not logs.records:
+                time.sleep(0.001)
+                assert time.monotonic() - start < 10.0
+
+        debouncer.schedule(2, delay=0.001, max_wait=1.0)
+
+        assert self.called.wait(timeout=10.0)
+        assert self.calls == [[2]]
+        assert logs.records[0].getMessage() == "Error in debounced callback"
+
+
+class WatchedRootsTests(SimpleTestCase):
+    def test_kinds(self):
+        roots = views.watched_roots()
+
+        assert roots[settings.BASE_DIR / "templates" / "django"].kind == "template"
+        assert roots[settings.BASE_DIR / "templates" / "jinja"].kind == "jinja"
+        assert roots[settings.BASE_DIR / "static"] == views.WatchedRoot(
+            settings.BASE_DIR / "static", "static", ""
+        )
+
+    def test_static_prefix(self):
+        extra = settings.BASE_DIR / "extra"
+
+        with override_settings(STATICFILES_DIRS=[("pre", extra)]):
+            roots = views.watched_roots()
+
+        assert roots[extra] == views.WatchedRoot(extra, "static", "pre")
+
+    def test_cached(self):
+        assert views.watched_roots() is views.watched_roots()
+
+    def test_cleared_on_setting_change(self):
+        roots = views.watched_roots()
+        extra = settings.BASE_DIR / "extra"
+
+        with override_settings(STATICFILES_DIRS=[extra]):
+            assert views.watched_roots() is not roots
+            assert views.watched_roots()[extra].kind == "static"
+
+        assert extra not in views.watched_roots()
+
+    def test_other_setting_change_ignored(self):
+        roots = views.watched_roots()
+
+        with override_settings(USE_TZ=False):
+            assert views.watched_roots() is roots
+
+
+class ClassifyPathTests(SimpleTestCase):
+    def test_none(self):
+        assert views.classify_path(Path("/tmp/nothing")) is None
+
+    def test_root_itself(self):
+        path = settings.BASE_DIR / "static"
+
+        assert views.classify_path(path) is None
+
+    def test_nested(self):
+        path = settings.BASE_DIR / "static" / "css" / "deep" / "example.css"
+
+        root = views.classify_path(path)
+
+        assert root is not None
+        assert root.path == settings.BASE_DIR / "static"
+
+
+class IsStaticIncludedTests(SimpleTestCase):
+    root = Path("/static")
+
+    def test_included(self):
+        assert views.is_static_included(self.root / "css" / "a.css", self.root)
+
+    def test_ignored_file(self):
+        assert not views.is_static_included(self.root / "js" / "a.js.map", self.root)
+
+    def test_ignored_directory(self):
+        path = self.root / "node_modules" / "pkg" / "index.js"
+
+        assert not views.is_static_included(path, self.root)
+
+    def test_root_not_matched(self):
+        root = Path("/.hidden/static")
+
+        assert views.is_static_included(root / "a.css", root)
+
+    @override_settings(BROWSER_RELOAD_STATIC_IGNORE_PATTERNS=[])
+    def test_no_ignore_patterns(self):
+        path = self.root / "node_modules" / "pkg" / "index.js"
+
+        assert views.is_static_included(path, self.root)
+
+    @override_settings(BROWSER_RELOAD_STATIC_INCLUDE_PATTERNS=["*.css", "*.js"])
+    def test_include_patterns(self):
+        assert views.is_static_included(self.root / "css" / "a.css", self.root)
+        assert not views.is_static_included(self.root / "img" / "a.png", self.root)
+
+
+class StaticWatchGlobsTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name)
+
+    def make_files(self, *names: str) -> None:
+        for name in names:
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def test_missing(self):
+        root = self.root / "missing"
+
+        assert views.static_watch_globs(root) == [(root, "**/*")]
+
+    def test_clean(self):
+        self.make_files("a.css", "css/b.css", "js/sub/c.js")
+
+        assert views.static_watch_globs(self.root) == [(self.root, "**/*")]
+
+    def test_ignored_directories(self):
+        self.make_files(
+            "a.css",
+            "css/b.css",
+            "node_modules/pkg/index.js",
+            "js/sub/c.js",
+            "js/.cache/d",
+        )
+
+        result = views.static_watch_globs(self.root)
+
+        assert sorted(result) == [
+            (self.root, "*"),
+            (self.root / "css", "**/*"),
+            (self.root / "js", "*"),
+            (self.root / "js" / "sub", "**/*"),
+        ]
+
+    def test_symlink(self):
+        self.make_files("node_modules/a.js", "real/b.js")
+        (self.root / "link").symlink_to(self.root / "real")
+
+        result = views.static_watch_globs(self.root)
+
+        assert sorted(result) == [
+            (self.root, "*"),
+            (self.root / "link", "**/*"),
+            (self.root / "real", "**/*"),
+        ]
+
+    @override_settings(BROWSER_RELOAD_STATIC_INCLUDE_PATTERNS=["*.css", "*.js"])
+    def test_include_patterns(self):
+        self.make_files("a.css", "node_modules/a.js", "css/b.css")
+
+        result = views.static_watch_globs(self.root)
+
+        assert sorted(result) == [
+            (self.root, "*.css"),
+            (self.root, "*.js"),
+            (self.root / "css", "**/*.css"),
+            (self.root / "css", "**/*.js"),
+        ]
+
 
 class OnFileChangedTests(SimpleTestCase):
+    def setUp(self):
+        self.subscriber = views.reload_hub.subscribe()
+
     def test_ignored(self):
         views.on_file_changed(file_path=Path("/tmp/nothing"))
 
         time.sleep(views.RELOAD_DEBOUNCE_TIME * 1.1)
-        assert not views.should_reload_event.is_set()
+        assert not self.subscriber.poll()
 
     def test_django_template(self):
         path = settings.BASE_DIR / "templates" / "django" / "example.html"
 
         result = views.on_file_changed(file_path=path)
 
-        time.sleep(views.RELOAD_DEBOUNCE_TIME * 1.1)
         assert result is True
-        assert views.should_reload_event.is_set()
-        views.should_reload_event.clear()
+        assert self.subscriber.wait(timeout=10.0) == [
+            views.message("reload", changes=[{"kind": "template", "path": str(path)}])
+        ]
 
     def test_jinja_template(self):
         path = settings.BASE_DIR / "templates" / "jinja" / "example.html"
 
         result = views.on_file_changed(file_path=path)
 
-        time.sleep(views.RELOAD_DEBOUNCE_TIME * 1.1)
         assert result is True
-        assert views.should_reload_event.is_set()
-        views.should_reload_event.clear()
+        assert self.subscriber.wait(timeout=10.0) == [
+            views.message("reload", changes=[{"kind": "jinja", "path": str(path)}])
+        ]
 
     def test_static_asset(self):
+        path = settings.BASE_DIR / "static" / "example.js"
+
+        result = views.on_file_changed(file_path=path)
+
+        assert result is True
+        assert self.subscriber.wait(timeout=10.0) == [
+            views.message(
+                "reload",
+                changes=[
+                    {"kind": "static", "path": str(path), "url": "/static/example.js"}
+                ],
+            )
+        ]
+
+    def test_static_ignored(self):
+        path = settings.BASE_DIR / "static" / "node_modules" / "example.js"
+
+        result = views.on_file_changed(file_path=path)
+
+        time.sleep(views.RELOAD_DEBOUNCE_TIME * 1.1)
+        assert result is True
+        assert self.subscriber.poll() == []
+
+    def test_static_stylesheet(self):
         path = settings.BASE_DIR / "static" / "example.css"
 
         result = views.on_file_changed(file_path=path)
 
+        assert result is True
+        assert self.subscriber.wait(timeout=10.0) == [
+            views.message(
+                "css",
+                paths=["/static/example.css"],
+                changes=[
+                    {
+                        "kind": "static",
+                        "path": str(path),
+                        "url": "/static/example.css",
+                    }
+                ],
+            )
+        ]
+
+    def test_counted(self):
+        stats.reset()
+        self.addCleanup(stats.reset)
+
+        views.on_file_changed(file_path=Path("/tmp/nothing"))
+        views.on_file_changed(
+            file_path=settings.BASE_DIR / "static" / "node_modules" / "a.js"
+        )
+
+        assert stats.snapshot() == {"file_changed": 2, "file_skipped": 2}
+
+    @override_settings(BROWSER_RELOAD_CONTENT_HASH=True)
+    def test_content_hash_unchanged(self):
+        path = settings.BASE_DIR / "templates" / "django" / "part.html"
+        views.file_fingerprints.entries.clear()
+        views.file_fingerprints.changed(path)
+
+        result = views.on_file_changed(file_path=path)
+
         time.sleep(views.RELOAD_DEBOUNCE_TIME * 1.1)
         assert result is True
-        assert views.should_reload_event.is_set()
-        views.should_reload_event.clear()
+        assert self.subscriber.poll() == []
+
+
+class FingerprintCacheTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / "example.css"
+        self.path.write_text("a {}")
+        self.cache = views.FingerprintCache(maxsize=2)
+
+    def test_first_change(self):
+        assert self.cache.changed(self.path) is True
+        assert (self.cache.hits, self.cache.misses) == (0, 1)
+
+    def test_unchanged_stat(self):
+        self.cache.changed(self.path)
+
+        assert self.cache.changed(self.path) is False
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+    def test_same_content(self):
+        self.cache.changed(self.path)
+        os.utime(self.path, ns=(0, 0))
+
+        assert self.cache.changed(self.path) is False
+        assert self.cache.entries[self.path][1] == 0
+
+    def test_different_content(self):
+        self.cache.changed(self.path)
+        self.path.write_text("b {}")
+        os.utime(self.path, ns=(0, 0))
+
+        assert self.cache.changed(self.path) is True
+
+    def test_deleted(self):
+        self.cache.changed(self.path)
+        self.path.unlink()
+
+        assert self.cache.changed(self.path) is True
+        assert self.path not in self.cache.entries
+
+    def test_evicts_least_recently_used(self):
+        other = self.path.with_name("other.css")
+        other.write_text("b {}")
+        third = self.path.with_name("third.css")
+        third.write_text("c {}")
+        self.cache.changed(self.path)
+        self.cache.changed(other)
+        self.cache.changed(self.path)
+
+        self.cache.changed(third)
+
+        assert list(self.cache.entries) == [self.path, third]
+
+
+class CachedMessageTests(SimpleTestCase):
+    def test_success(self):
+        result = views.cached_message("ping", versionId="abc")
+
+        assert result == views.message("ping", versionId="abc")
+        assert views.cached_message("ping", versionId="abc") is result
+
+
+class FullReloadMessageTests(SimpleTestCase):
+    def test_success(self):
+        result = views.full_reload_message()
+
+        assert views.message_data(result) == {"type": "reload", "changes": None}
+
+
+class ReloadMessageTests(SimpleTestCase):
+    static_root = views.WatchedRoot(settings.BASE_DIR / "static", "static")
+
+    def test_template(self):
+        root = views.WatchedRoot(settings.BASE_DIR / "templates", "template")
+        change = views.Change(root.path / "example.css", root)
+
+        result = views.reload_message([change])
+
+        assert result == views.message(
+            "reload",
+            changes=[{"kind": "template", "path": str(change.path)}],
+        )
+
+    def test_stylesheets(self):
+        changes = [
+            views.Change(self.static_root.path / "a.css", self.static_root),
+            views.Change(self.static_root.path / "b" / "c.css", self.static_root),
+        ]
+
+        result = views.reload_message(changes)
+
+        assert result == views.message(
+            "css",
+            paths=["/static/a.css", "/static/b/c.css"],
+            changes=[change.as_json() for change in changes],
+        )
+
+    def test_stylesheet_prefix(self):
+        root = views.WatchedRoot(settings.BASE_DIR / "extra", "static", "pre")
+        change = views.Change(root.path / "a.css", root)
+
+        result = views.reload_message([change])
+
+        assert result == views.message(
+            "css",
+            paths=["/static/pre/a.css"],
+            changes=[
+                {"kind": "static", "path": str(change.path), "url": "/static/pre/a.css"}
+            ],
+        )
+
+    def test_mixed(self):
+        changes = [
+            views.Change(self.static_root.path / "a.css", self.static_root),
+            views.Change(self.static_root.path / "a.js", self.static_root),
+        ]
+
+        result = views.reload_message(changes)
+
+        assert result == views.message(
+            "reload",
+            changes=[
+                {
+                    "kind": "static",
+                    "path": str(changes[0].path),
+                    "url": "/static/a.css",
+                },
+                {
+                    "kind": "static",
+                    "path": str(changes[1].path),
+                    "url": "/static/a.js",
+                },
+            ],
+        )
+
+    def test_empty(self):
+        assert views.reload_message([]) == views.message("reload", changes=[])
+
+
+class ReloadHubTests(SimpleTestCase):
+    def setUp(self):
+        self.hub = views.ReloadHub()
+
+    def test_poll_nothing(self):
+        subscriber = self.hub.subscribe()
+
+        assert subscriber.poll() == []
+
+    def test_poll_delivered_once(self):
+        subscriber = self.hub.subscribe()
+        self.hub.publish(b"a")
+
+        assert subscriber.poll() == [b"a"]
+        assert subscriber.poll() == []
+
+    def test_all_subscribers_receive(self):
+        subscribers = [self.hub.subscribe() for _ in range(3)]
+        self.hub.publish(b"a")
+
+        assert [s.poll() for s in subscribers] == [[b"a"], [b"a"], [b"a"]]
+
+    def test_several_messages(self):
+        subscriber = self.hub.subscribe()
+        self.hub.publish(b"a")
+        self.hub.publish(b"b")
+
+        assert subscriber.poll() == [b"a", b"b"]
+
+    def test_fallen_behind(self):
+        subscriber = self.hub.subscribe()
+        for _ in range(self.hub.HISTORY_SIZE + 1):
+            self.hub.publish(b"a")
+
+        assert subscriber.poll() == [views.full_reload_message()]
+
+    def test_late_subscriber_skips_earlier(self):
+        self.hub.publish(b"a")
+        subscriber = self.hub.subscribe()
+
+        assert subscriber.poll() == []
+
+    def test_publish_generation(self):
+        subscriber = self.hub.subscribe()
+
+        self.hub.publish(b"a", generation=1)
+
+        assert subscriber.poll() == [b"a"]
+
+    def test_publish_generation_skipped(self):
+        subscriber = self.hub.subscribe()
+        self.hub.publish(b"a")
+
+        self.hub.publish(b"b", generation=3)
+
+        assert subscriber.poll() == [views.full_reload_message()]
+        assert self.hub.generation == 3
+
+    def test_publish_generation_superseded(self):
+        self.hub.publish(b"a", generation=2)
+        subscriber = self.hub.resume(self.hub.cursor(0))
+
+        self.hub.publish(b"b", generation=1)
+
+        assert subscriber is not None
+        assert subscriber.poll() == [views.full_reload_message()]
+        assert self.hub.generation == 2
+
+    def test_follow(self):
+        subscriber = self.hub.subscribe()
+        self.hub.publish(b"a")
+
+        self.hub.follow("shared", 10)
+        self.hub.publish(b"b")
+
+        assert self.hub.generation == 11
+        assert subscriber.poll() == [b"a", b"b"]
+        assert self.hub.cursor(11) == "shared-11"
+
+    def test_resume(self):
+        cursor = self.hub.cursor(self.hub.generation)
+        self.hub.publish(b"a")
+
+        subscriber = self.hub.resume(cursor)
+
+        assert subscriber is not None
+        assert subscriber.poll() == [b"a"]
+        assert self.hub.cursor(subscriber.generation) == f"{self.hub.id}-1"
+
+    def test_resume_other_hub(self):
+        cursor = views.ReloadHub().cursor(0)
+
+        assert self.hub.resume(cursor) is None
+
+    def test_resume_invalid(self):
+        assert self.hub.resume("") is None
+        assert self.hub.resume(f"{self.hub.id}-x") is None
+
+    def test_resume_future(self):
+        assert self.hub.resume(self.hub.cursor(1)) is None
+
+    def test_wait_timeout(self):
+        subscriber = self.hub.subscribe()
+
+        assert subscriber.wait(timeout=0.001) == []
+
+    def test_wait_woken_by_other_thread(self):
+        subscriber = self.hub.subscribe()
+        timer = threading.Timer(0.01, self.hub.publish, args=(b"a",))
+        timer.start()
+
+        try:
+            assert subscriber.wait(timeout=10.0) == [b"a"]
+        finally:
+            timer.join()
+
+    async def test_wait_async_timeout(self):
+        subscriber = self.hub.subscribe()
+        subscriber.bind_loop()
+
+        assert await subscriber.wait_async(timeout=0.001) == []
+
+    async def test_wait_async_pending(self):
+        subscriber = self.hub.subscribe()
+        subscriber.bind_loop()
+        self.hub.publish(b"a")
+
+        assert await subscriber.wait_async(timeout=10.0) == [b"a"]
+        assert await subscriber.wait_async(timeout=0.001) == []
+
+    async def test_wait_async_woken_by_other_thread(self):
+        subscriber = self.hub.subscribe()
+        subscriber.bind_loop()
+        timer = threading.Timer(0.01, self.hub.publish, args=(b"a",))
+        timer.start()
+
+        try:
+            assert await subscriber.wait_async(timeout=10.0) == [b"a"]
+        finally:
+            timer.join()
+
+    def test_unsubscribe(self):
+        subscriber = self.hub.subscribe()
+
+        self.hub.unsubscribe(subscriber)
+
+        assert len(self.hub.subscribers) == 0
+
+
+class FileChannelTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / "state.json"
+
+    def make_channel(self, hub: views.ReloadHub) -> views.FileChannel:
+        channel = views.FileChannel(self.path, hub)
+        self.addCleanup(channel.close)
+        return channel
+
+    def test_publishes_version(self):
+        channel = self.make_channel(views.ReloadHub())
+
+        assert channel.version_id == views.version_id
+        state = json.loads(self.path.read_text())
+        assert state == {
+            "versionId": views.version_id,
+            "pid": os.getpid(),
+            "hubId": state["hubId"],
+        }
+
+    def test_adopts_live_version(self):
+        self.path.write_text(json.dumps({"versionId": "abc", "pid": os.getpid()}))
+
+        channel = self.make_channel(views.ReloadHub())
+
+        assert channel.version_id == "abc"
+
+    def test_replaces_dead_version(self):
+        self.path.write_text(json.dumps({"versionId": "abc", "pid": 2**22 + 1}))
+
+        channel = self.make_channel(views.ReloadHub())
+
+        assert channel.version_id == views.version_id
+
+    def test_replaces_corrupt(self):
+        self.path.write_text("[")
+
+        channel = self.make_channel(views.ReloadHub())
+
+        assert channel.version_id == views.version_id
+
+    def test_replaces_non_dict(self):
+        self.path.write_text("[]")
+
+        channel = self.make_channel(views.ReloadHub())
+
+        assert channel.version_id == views.version_id
+
+    def test_concurrent_publishes(self):
+        # Channels hold separate thread locks, like separate processes.
+        channels = [self.make_channel(views.ReloadHub()) for _ in range(4)]
+
+        def publish(channel: views.FileChannel) -> None:
+            for _ in range(25):
+                channel.publish(views.message("reload"))
+
+        threads = [
+            threading.Thread(target=publish, args=(channel,)) for channel in channels
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert json.loads(self.path.read_text())["generation"] == 100
+
+    def test_reload_relayed(self):
+        hub1 = views.ReloadHub()
+        hub2 = views.ReloadHub()
+        channel1 = self.make_channel(hub1)
+        channel2 = self.make_channel(hub2)
+        subscriber1 = hub1.subscribe()
+        subscriber2 = hub2.subscribe()
+
+        channel1.publish(b"a")
+        channel1.poll()
+        channel2.poll()
+
+        assert subscriber1.poll() == []
+        assert subscriber2.poll() == [b"a"]
+        assert channel2.generation == 1
+
+    def test_several_missed_relayed_as_reload(self):
+        hub = views.ReloadHub()
+        channel = self.make_channel(hub)
+        subscriber = hub.subscribe()
+        self.path.write_text(json.dumps({"generation": 2, "message": "a"}))
+
+        channel.poll()
+
+        assert subscriber.poll() == [views.full_reload_message()]
+
+    def test_cursor_shared(self):
+        hub1 = views.ReloadHub()
+        hub2 = views.ReloadHub()
+        channel1 = self.make_channel(hub1)
+        channel2 = self.make_channel(hub2)
+        cursor = hub1.cursor(hub1.generation)
+
+        hub1.publish(b"a", generation=channel1.publish(b"a"))
+        channel2.poll()
+
+        assert hub1.id == hub2.id
+        subscriber = hub2.resume(cursor)
+        assert subscriber is not None
+        assert subscriber.poll() == [b"a"]
+        assert hub2.cursor(subscriber.generation) == hub1.cursor(hub1.generation)
+
+    def test_follows_generation(self):
+        self.path.write_text(json.dumps({"generation": 5}))
+        hub = views.ReloadHub()
+        subscriber = hub.subscribe()
+
+        self.make_channel(hub)
+
+        assert hub.generation == 5
+        assert subscriber.poll() == []
+
+    def test_file_replaced(self):
+        hub = views.ReloadHub()
+        channel = self.make_channel(hub)
+        hub.publish(b"a", generation=channel.publish(b"a"))
+        subscriber = hub.subscribe()
+        self.path.write_text(json.dumps({"generation": 0}))
+
+        channel.poll()
+
+        assert subscriber.poll() == [views.full_reload_message()]
+        assert channel.generation == 0
+
+    def test_reload_relayed_by_thread(self):
+        hub = views.ReloadHub()
+        self.make_channel(hub)
+        other = self.make_channel(views.ReloadHub())
+        subscriber = hub.subscribe()
+
+        other.publish(b"a")
+
+        assert subscriber.wait(timeout=10.0) == [b"a"]
+
+    def test_version_updated(self):
+        channel = self.make_channel(views.ReloadHub())
+        self.path.write_text(json.dumps({"versionId": "abc", "generation": 0}))
+
+        channel.poll()
+
+        assert channel.version_id == "abc"
+
+
+class GetChannelTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_path = Path(temp_dir.name)
+
+    def test_unset(self):
+        assert views.get_channel() is None
+        assert views.current_version_id() == views.version_id
+
+    def test_set(self):
+        path = self.temp_path / "state.json"
+        with override_settings(BROWSER_RELOAD_SHARED_STATE_FILE=str(path)):
+            channel = views.get_channel()
+            assert channel is not None
+            assert channel.path == path
+            assert views.get_channel() is channel
+            assert views.current_version_id() == channel.version_id
+
+        assert views.get_channel() is None
+        assert channel.stopped.is_set()
+
+    def test_changed(self):
+        path1 = self.temp_path / "state1.json"
+        path2 = self.temp_path / "state2.json"
+        with override_settings(BROWSER_RELOAD_SHARED_STATE_FILE=path1):
+            channel1 = views.get_channel()
+        with override_settings(BROWSER_RELOAD_SHARED_STATE_FILE=path2):
+            channel2 = views.get_channel()
+            assert channel2 is not None
+            assert channel2.path == path2
+        assert channel1 is not None
+        assert channel1.stopped.is_set()
+        assert views.get_channel() is None
+
+    def test_broadcast(self):
+        path = self.temp_path / "state.json"
+        subscriber = views.reload_hub.subscribe()
+        with override_settings(BROWSER_RELOAD_SHARED_STATE_FILE=path):
+            views.broadcast(b"a")
+            state = json.loads(path.read_text())
+        views.get_channel()
+
+        assert subscriber.poll() == [b"a"]
+        assert state["generation"] == 1
+        assert state["message"] == "a"
 
 
 @override_settings(DEBUG=True)
@@ -96,7 +1123,8 @@ class EventsTests(SimpleTestCase):
         response_iterable = iter(response)
         event = next(response_iterable)
         assert event == (
-            b'data: {"type": "ping", "versionId": "'
+            b"retry: 300\n"
+            + b'data: {"type": "ping", "versionId": "'
             + views.version_id.encode()
             + b'"}\n\n'
         )
@@ -111,12 +1139,24 @@ class EventsTests(SimpleTestCase):
         response_iterable = iter(response)
         event1 = next(response_iterable)
         event2 = next(response_iterable)
-        assert event1 == event2
+        assert event1 == b"retry: 300\n" + event2
+
+    @override_settings(
+        BROWSER_RELOAD_PING_INTERVAL=0.001, BROWSER_RELOAD_RECONNECT_DELAY=1.5
+    )
+    def test_success_settings(self):
+        response = self.client.get("/__reload__/events/")
+        assert isinstance(response, StreamingHttpResponse)
+
+        response_iterable = iter(response)
+        event1 = next(response_iterable)
+        event2 = next(response_iterable)
+        assert event1 == b"retry: 1500\n" + event2
 
     def test_success_template_change(self):
         response = self.client.get("/__reload__/events/")
         assert isinstance(response, StreamingHttpResponse)
-        views.should_reload_event.set()
+        views.reload_hub.publish(views.message("reload"))
 
         assert response.status_code == HTTPStatus.OK
         assert response.headers["content-type"] == "text/event-stream"
@@ -125,14 +1165,35 @@ class EventsTests(SimpleTestCase):
         next(response_iterable)
         event = next(response_iterable)
         assert event == b'data: {"type": "reload"}\n\n'
-        assert not views.should_reload_event.is_set()
+
+    def test_success_template_change_multiple_streams(self):
+        responses = [self.client.get("/__reload__/events/") for _ in range(2)]
+        views.reload_hub.publish(views.message("reload"))
+
+        for response in responses:
+            assert isinstance(response, StreamingHttpResponse)
+            response_iterable = iter(response)
+            # Skip version ID message
+            next(response_iterable)
+            event = next(response_iterable)
+            assert event == b'data: {"type": "reload"}\n\n'
+
+    def test_close_unsubscribes(self):
+        response = self.client.get("/__reload__/events/")
+        assert isinstance(response, StreamingHttpResponse)
+        next(iter(response))
+        count = len(views.reload_hub.subscribers)
+
+        response.close()
+
+        assert len(views.reload_hub.subscribers) == count - 1
 
     def test_success_template_change_with_gzip(self):
         middleware = GZipMiddleware(views.events)
         request = RequestFactory(headers={"accept-encoding": "gzip"}).get("/")
         response = middleware(request)
         assert isinstance(response, StreamingHttpResponse)
-        views.should_reload_event.set()
+        views.reload_hub.publish(views.message("reload"))
 
         assert response.status_code == HTTPStatus.OK
         assert response.headers["content-type"] == "text/event-stream"
@@ -142,7 +1203,139 @@ class EventsTests(SimpleTestCase):
         next(response_iterable)
         event = next(response_iterable)
         assert event == b'data: {"type": "reload"}\n\n'
-        assert not views.should_reload_event.is_set()
+
+    @override_settings(BROWSER_RELOAD_LONG_POLL=True)
+    def test_long_poll(self):
+        generation = views.reload_hub.generation
+
+        response = self.client.get("/__reload__/events/")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"] == "text/event-stream"
+        assert views.message_data(response.content) == {
+            "type": "transport",
+            "url": "/__reload__/poll/",
+            "cursor": views.reload_hub.cursor(generation),
+        }
+
+
+@override_settings(DEBUG=True, BROWSER_RELOAD_LONG_POLL_TIMEOUT=0.001)
+class PollTests(SimpleTestCase):
+    @override_settings(DEBUG=False)
+    def test_fail_not_debug(self):
+        response = self.client.get("/__reload__/poll/")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_no_cursor(self):
+        response = self.client.get("/__reload__/poll/")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["cache-control"] == "no-store"
+        assert response.json() == {
+            "versionId": views.version_id,
+            "cursor": views.reload_hub.cursor(views.reload_hub.generation),
+            "messages": [],
+        }
+
+    def test_timeout(self):
+        cursor = views.reload_hub.cursor(views.reload_hub.generation)
+
+        response = self.client.get("/__reload__/poll/", {"cursor": cursor})
+
+        assert response.json()["cursor"] == cursor
+        assert response.json()["messages"] == []
+
+    def test_messages(self):
+        cursor = views.reload_hub.cursor(views.reload_hub.generation)
+        views.reload_hub.publish(views.message("reload"))
+
+        response = self.client.get("/__reload__/poll/", {"cursor": cursor})
+
+        assert response.json()["cursor"] == views.reload_hub.cursor(
+            views.reload_hub.generation
+        )
+        assert response.json()["messages"] == [{"type": "reload"}]
+
+    def test_fallen_behind(self):
+        cursor = views.reload_hub.cursor(views.reload_hub.generation)
+        for _ in range(views.reload_hub.HISTORY_SIZE + 1):
+            views.reload_hub.publish(views.message("reload", changes=[]))
+
+        response = self.client.get("/__reload__/poll/", {"cursor": cursor})
+
+        assert response.json()["messages"] == [{"type": "reload", "changes": None}]
+
+    @override_settings(BROWSER_RELOAD_LONG_POLL_TIMEOUT=10.0)
+    def test_unknown_cursor_held(self):
+        with mock.patch.object(
+            views.Subscriber, "wait", autospec=True, return_value=[]
+        ) as mock_wait:
+            response = self.client.get("/__reload__/poll/", {"cursor": "other-1"})
+
+        assert response.json()["messages"] == []
+        assert mock_wait.call_args.kwargs == {"timeout": views.LONG_POLL_RESYNC_DELAY}
+
+    def test_other_process_cursor(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "state.json"
+            with override_settings(BROWSER_RELOAD_SHARED_STATE_FILE=path):
+                channel = views.get_channel()
+                assert channel is not None
+                cursor = views.reload_hub.cursor(views.reload_hub.generation)
+                # Publish from another process.
+                other = views.FileChannel(path, views.ReloadHub())
+                self.addCleanup(other.close)
+                other.publish(views.message("reload"))
+
+                response = self.client.get("/__reload__/poll/", {"cursor": cursor})
+
+            views.get_channel()
+
+        assert response.json()["messages"] == [{"type": "reload"}]
+        assert response.json()["cursor"] == f"{channel.hub.id}-1"
+
+    @override_settings(BROWSER_RELOAD_LONG_POLL_TIMEOUT=10.0)
+    def test_woken_by_other_thread(self):
+        cursor = views.reload_hub.cursor(views.reload_hub.generation)
+        timer = threading.Timer(
+            0.01, views.reload_hub.publish, args=(views.message("reload"),)
+        )
+        timer.start()
+
+        try:
+            response = self.client.get("/__reload__/poll/", {"cursor": cursor})
+        finally:
+            timer.join()
+
+        assert response.json()["messages"] == [{"type": "reload"}]
+
+
+@override_settings(DEBUG=True)
+class StatsViewTests(SimpleTestCase):
+    @override_settings(DEBUG=False)
+    def test_fail_not_debug(self):
+        response = self.client.get("/__reload__/stats/")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_success(self):
+        stats.reset()
+        self.addCleanup(stats.reset)
+        stats.record("file_changed")
+        subscriber = views.reload_hub.subscribe()
+        self.addCleanup(views.reload_hub.unsubscribe, subscriber)
+
+        response = self.client.get("/__reload__/stats/")
+
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data["versionId"] == views.version_id
+        assert data["counters"] == {"file_changed": 1}
+        assert data["subscribers"] >= 1
+        assert data["generation"] == views.reload_hub.generation
+        assert data["debouncer"]["fired"] == views.reload_debouncer.fired
+        assert data["fingerprints"]["hits"] == views.file_fingerprints.hits
 
 
 @override_settings(DEBUG=True)
@@ -169,7 +1362,8 @@ class AsyncEventsTests(SimpleTestCase):
 
         event = await anext(aiter(response))
         assert event == (
-            b'data: {"type": "ping", "versionId": "'
+            b"retry: 300\n"
+            + b'data: {"type": "ping", "versionId": "'
             + views.version_id.encode()
             + b'"}\n\n'
         )
@@ -184,12 +1378,12 @@ class AsyncEventsTests(SimpleTestCase):
         response_iter = aiter(response)
         event1 = await anext(response_iter)
         event2 = await anext(response_iter)
-        assert event1 == event2
+        assert event1 == b"retry: 300\n" + event2
 
     async def test_success_template_change(self):
         response = await self.async_client.get("/__reload__/events/")
         assert isinstance(response, StreamingHttpResponse)
-        views.should_reload_event.set()
+        views.reload_hub.publish(views.message("reload"))
 
         assert response.status_code == HTTPStatus.OK
         assert response.headers["content-type"] == "text/event-stream"
@@ -198,4 +1392,48 @@ class AsyncEventsTests(SimpleTestCase):
         await anext(response_iter)
         event = await anext(response_iter)
         assert event == b'data: {"type": "reload"}\n\n'
-        assert not views.should_reload_event.is_set()
+
+    @mock.patch.object(views, "PING_DELAY", 10.0)
+    async def test_success_template_change_pushed(self):
+        response = await self.async_client.get("/__reload__/events/")
+        assert isinstance(response, StreamingHttpResponse)
+        response_iter = aiter(response)
+        # Skip version ID message
+        await anext(response_iter)
+        timer = threading.Timer(
+            0.01, views.reload_hub.publish, args=(views.message("reload"),)
+        )
+        timer.start()
+
+        try:
+            event = await asyncio.wait_for(anext(response_iter), 5.0)
+        finally:
+            timer.join()
+        assert event == b'data: {"type": "reload"}\n\n'
+
+
+class TriggerReloadSoonTests(SimpleTestCase):
+    @override_settings(
+        BROWSER_RELOAD_DEBOUNCE_TIME=0.001,
+        BROWSER_RELOAD_DEBOUNCE_MAX_WAIT_TIME=0.002,
+    )
+    def test_settings(self):
+        root = views.WatchedRoot(settings.BASE_DIR / "static", "static")
+        change = views.Change(root.path / "a.js", root)
+
+        with mock.patch.object(views.reload_debouncer, "schedule") as mock_schedule:
+            views.trigger_reload_soon(change)
+
+        mock_schedule.assert_called_once_with(change, delay=0.001, max_wait=0.002)
+
+    @override_settings(BROWSER_RELOAD_DEBOUNCE_MAX_WAIT_TIME=None)
+    def test_quiet_period(self):
+        root = views.WatchedRoot(settings.BASE_DIR / "static", "static")
+        change = views.Change(root.path / "a.js", root)
+
+        with mock.patch.object(views.reload_debouncer, "schedule") as mock_schedule:
+            views.trigger_reload_soon(change)
+
+        mock_schedule.assert_called_once_with(
+            change, delay=views.RELOAD_DEBOUNCE_TIME, max_wait=None
+        )